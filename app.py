@@ -1,24 +1,16 @@
-from tkinter import Image
 import sys
 import os
 
 # 将项目根目录加入系统路径
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-import requests
-from flask import Flask, jsonify, render_template, request, current_app
-from py2neo import Graph
-import jieba
-from wordcloud import WordCloud
+from flask import Blueprint, Flask, Response, jsonify, render_template, request, current_app, make_response, send_file
 import base64
 import io
-import os
-import pandas as pd
-from PIL import Image, ImageDraw, ImageFont, ImageEnhance
 import hashlib
-from io import BytesIO
+import re
+import threading
 from dotenv import load_dotenv
-from dashscope import ImageSynthesis
 from enum import Enum
 from flask_cors import CORS
 
@@ -31,30 +23,95 @@ class DiffusionModel(str, Enum):
 # 统一清洗传入的name
 # 使用绝对导入
 from data_processing.neo4j_import import clean_author_name
+from bio_store import bio_store
+from graph_client import create_graph_client
+from heatmap import heatmap_rows
+from geo_clusters import GeoClusterStore, MAX_ZOOM, parse_bbox
+from graph_analytics import AnalyticsSnapshot
+from imagery_store import ImageryStore
+from network import MAX_DEPTH, expand_network, force_layout
+from poem_index import PoemIndexHolder, SEARCH_FIELDS
+from poet_directory import PoetDirectory, SORT_OPTIONS
+import poet_batch
+from pagination import page_params, page_headers
+from ttl_cache import TTLCache
+from timeline import TimelineCache, anshi_stats, office_stats, parse_periods
+from render_cache import RenderCache, content_key
+from response_cache import cached_response, dataset_version, response_cache
+from segmentation import tokenizer
+import word_freq
+import ink
+import metrics
+from ink import ink_jobs
+from ink_store import ink_store
 
 env_path = os.path.join(os.path.dirname(__file__), '..', '.env')
 if os.path.exists(env_path):
     load_dotenv(env_path)  # 确保能加载上级目录的.env
 else:
-    raise RuntimeError("未找到.env文件，请在项目根目录创建！")
+    print(f"[WARN] 未找到.env文件（{os.path.abspath(env_path)}），将仅使用系统环境变量")
 
 
 def get_dashscope_client():
+    from dashscope import ImageSynthesis
     return ImageSynthesis(api_key=os.getenv("DASHSCOPE_API_KEY"))
 
 
-# 关键配置（使用相对路径）
-app = Flask(__name__,
-            static_folder='static',
-            template_folder='templates')
-CORS(app)
+# 以下对象构造时均不做 I/O：数据库在首次查询时才连接，各类快照在首次使用时加载
+# 连接配置见 .env：NEO4J_URI / NEO4J_USER / NEO4J_PASSWORD / NEO4J_POOL_SIZE 等
+graph = create_graph_client()
+timeline_cache = TimelineCache(graph, ttl=int(os.getenv('TIMELINE_CACHE_TTL', '300')))
+poem_index = PoemIndexHolder(graph, ttl=int(os.getenv('POEM_INDEX_TTL', '3600')))
+imagery_store = ImageryStore(graph)
+geo_clusters = GeoClusterStore(graph)
+analytics = AnalyticsSnapshot(graph)
+poet_directory = PoetDirectory(graph, analytics, ttl=int(os.getenv('POET_DIRECTORY_TTL', '600')))
+
+# 数据版本更新（precompute.py bump-version）时清理所有派生缓存
+for invalidate in (timeline_cache.clear, poem_index.expire, poet_directory.expire):
+    dataset_version.on_change(invalidate)
 
-graph = Graph("bolt://localhost:7687", auth=("neo4j", "ty123456"))
+bp = Blueprint('poetry', __name__)
 
-app.config['STATIC_FOLDER'] = os.path.abspath('web_app/static')
+
+def create_app(warm=True):
+    """
+    应用工厂
+    :param warm: 是否在后台预热诗作索引与分词词典（测试时可关闭）
+    """
+    # 关键配置（使用相对路径）
+    app = Flask(__name__,
+                static_folder='static',
+                template_folder='templates')
+    CORS(app, expose_headers=['X-Total-Count', 'X-Next-Cursor'])
+    app.register_blueprint(bp)
+    metrics.init_app(app)
+
+    if warm:
+        poem_index.warm()
+        # 后台预热 jieba 词典与停用词，首个词云请求不再等待词典加载
+        threading.Thread(target=tokenizer.warm, daemon=True).start()
+    return app
+
+
+INK_FALLBACK_URL = '/static/images/default_ink_bg/default_ink_bg.jpg'
+# 图片地址随内容哈希变化，可长期缓存
+INK_MAX_AGE = 365 * 24 * 3600
+
+
+def ink_payload(manifest):
+    """url 为最大宽度的 JPEG（兼容旧前端），srcset 按格式列出各宽度"""
+    srcset = {}
+    for variant in manifest['variants']:
+        srcset.setdefault(variant['format'], []).append(f"{variant['url']} {variant['width']}w")
+    jpeg = [v for v in manifest['variants'] if v['format'] == 'jpeg']
+    return {
+        'url': jpeg[-1]['url'],
+        'srcset': {fmt: ', '.join(items) for fmt, items in srcset.items()},
+    }
 
 
-@app.route('/generate_ink', methods=['POST'])
+@bp.route('/generate_ink', methods=['POST'])
 def generate_ink_background():
     data = request.get_json()
     if not data or 'content' not in data:
@@ -62,228 +119,324 @@ def generate_ink_background():
 
     poem_content = data['content'][:200]
     cache_key = hashlib.md5(poem_content.encode()).hexdigest()
-    bg_path = os.path.join(app.config['STATIC_FOLDER'], 'images', 'poem_bg', f'{cache_key}.jpg')
 
-    if os.path.exists(bg_path):
-        return jsonify({'url': f'/static/images/poem_bg/{cache_key}.jpg'})
+    stored = ink_store.lookup(cache_key)
+    if stored is not None:
+        return jsonify(ink_payload(stored))
+
+    # 异步模式：入队后立即返回任务号，由前端轮询 /generate_ink/jobs/<job_id>
+    if data.get('async'):
+        job = ink_jobs.submit(cache_key, ink.generate_background, poem_content, cache_key)
+        return jsonify({
+            'job_id': job['id'],
+            'status': job['status'],
+            'poll': f'/generate_ink/jobs/{job["id"]}'
+        }), 202
 
     try:
-        # 优化后的Prompt模板
-        prompt = f"""
-        传统水墨风格插画，基于诗句：{poem_content}
-        元素要求：
-        - 使用水墨笔触技法，保留适当飞白效果
-        - 布局采用散点透视构图
-        - 色调为彩色+不要只有黑白
-        - 全部为景物，不要出现文字
-        - 用色建议：仅保留10%以下朱砂/花青点缀
-        - 构图参考：南宋马远“边角之景”布局
-        """
-
-        # 调用阿里云SDK（同步示例）
-        response = ImageSynthesis.call(
-            model="wanx2.1-t2i-turbo",
-            prompt=prompt,
-            parameters={
-                "size": "780*480",  # 匹配前端尺寸
-                "n": 1,
-                "style": "traditional ink painting",
-                "composition_ratio": "3:2"  # 固定宽高比
-            }
-        )
-
-        if response.status_code != 200:
-            raise Exception(f"API错误：{response.message}")
-
-        # 获取生成结果
-        result = response.output.results[0]
-        img_url = result.url
-
-        # 图片后期处理
-        img_resp = requests.get(img_url)
-        img = Image.open(BytesIO(img_resp.content))
-
-        # 增加水墨质感
-        img = img.convert("L")  # 转灰度
-        img = ImageEnhance.Contrast(img).enhance(1.2)  # 提高对比度
-        img = ImageEnhance.Sharpness(img).enhance(1.1)  # 锐化笔触
-
-        # 保存时压缩质量优化
-        buffer = BytesIO()
-        img.save(buffer, format="JPEG",
-                 quality=85,
-                 optimize=True,
-                 progressive=True)
-        buffer.seek(0)
-
-        # 存储到本地
-        with open(bg_path, 'wb') as f:
-            f.write(buffer.getvalue())
-
-        return jsonify({'url': f'/static/images/poem_bg/{cache_key}.jpg'})
+        return jsonify(ink_payload(ink.generate_background(poem_content, cache_key)))
 
     except Exception as e:
         current_app.logger.error(f"水墨生成失败 | 内容：{poem_content} | 错误：{str(e)}")
         return jsonify({
             'error': '生成服务繁忙',
-            'fallback': '/static/images/default_ink_bg.jpg'
+            'fallback': INK_FALLBACK_URL
         }), 503
 
 
-@app.route('/')
+@bp.route('/generate_ink/jobs/<job_id>')
+def get_ink_job(job_id):
+    job = ink_jobs.get(job_id)
+    stored = ink_store.lookup(job_id) if job is None or job['status'] == 'done' else None
+    if job is None:
+        # 任务记录已过期，但图片已落盘
+        if stored is not None:
+            return jsonify(dict(ink_payload(stored), job_id=job_id, status='done'))
+        return jsonify({'error': '任务不存在'}), 404
+
+    payload = {'job_id': job_id, 'status': job['status']}
+    if job['status'] == 'done' and stored is not None:
+        payload.update(ink_payload(stored))
+    elif job['status'] in ('done', 'failed'):
+        # 失败，或生成后已被存储淘汰
+        current_app.logger.error(f"水墨生成失败 | 任务：{job_id} | 错误：{job['error'] or '图片已被淘汰'}")
+        payload.update(status='failed', error='生成服务繁忙', fallback=INK_FALLBACK_URL)
+    return jsonify(payload)
+
+
+@bp.route('/ink/<digest>/<variant>')
+def get_ink_image(digest, variant):
+    """内容寻址的水墨背景图片，如 /ink/<digest>/480.webp"""
+    found = ink_store.file_path(digest, variant)
+    if found is None:
+        return jsonify({'error': '图片不存在'}), 404
+    path, mimetype = found
+    response = send_file(path, mimetype=mimetype, max_age=INK_MAX_AGE, conditional=True)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+@bp.route('/')
 def index():
     return render_template('index.html')
 
 
-@app.route('/api/poets')
-def get_poets():
-    query = """
-    MATCH (p:Poet) 
-    RETURN p.name as name, p.num_poems as count 
-    ORDER BY p.name
-    LIMIT 100
-    """
-    return jsonify([dict(row) for row in graph.run(query)])
+@bp.route('/healthz')
+def healthz():
+    status = graph.health()
+    return jsonify(status), 200 if status['ok'] else 503
+
+
+@bp.route('/metrics')
+def get_metrics():
+    """Prometheus 文本格式的进程内指标"""
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+
+@bp.route('/metrics/slow_queries')
+def get_slow_queries():
+    """最近的慢查询 PROFILE 采样（需设置 METRICS_PROFILE_SLOW_MS）"""
+    return jsonify({
+        'enabled': metrics.profiler.enabled,
+        'threshold_ms': metrics.profiler.threshold * 1000,
+        'queries': metrics.profiler.recent(),
+    })
+
+
+@bp.route('/metrics/response_cache')
+def get_response_cache_stats():
+    """响应缓存命中率与容量"""
+    return jsonify(dict(response_cache.stats(), dataset_version=dataset_version.get()))
 
 
-@app.route('/api/poet/<name>')
+@bp.route('/api/poets')
+@cached_response
+def get_poets():
+    """
+    诗人目录（内存快照，定期刷新）
+    ?sort=name|num_poems|centrality，?prefix= 姓名前缀，?limit=&cursor= 游标分页
+    """
+    sort = request.args.get('sort', 'name')
+    if sort not in SORT_OPTIONS:
+        return jsonify({'error': f"sort 仅支持：{', '.join(SORT_OPTIONS)}"}), 400
+    try:
+        offset, limit = page_params(request.args, default_limit=100, max_limit=5000)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    rows = poet_directory.list(sort, request.args.get('prefix', '').strip())
+    return jsonify(rows[offset:offset + limit]), 200, page_headers(offset, limit, len(rows))
+
+
+# 诗人详情聚合查询：用模式推导把各子集合 collect 到同一行
+# 代表作只取一首：子查询 LIMIT 1 后再投影，不为诗人的全部作品构造属性映射
+POET_PROFILE_QUERY = """
+MATCH (p:Poet {name: $name})
+CALL {
+    WITH p
+    OPTIONAL MATCH (p)-[:WROTE]->(poem:Poem)
+    RETURN poem LIMIT 1
+}
+RETURN p.name as name, p.birth as birth, p.death as death,
+       p.bio as bio, p.num_poems as poem_count,
+       [(p)-[r:VISITED]->(pl:Place) |
+            {name: pl.name, lat: pl.lat, lon: pl.lon, year: r.year, event: r.event}] as locations,
+       [(p)-[:FRIEND_OF]-(friend:Poet) | friend.name] as relations,
+       CASE WHEN poem IS NULL THEN [] ELSE [poem {.title, .content, .trans_content, .appear, .background,
+                                                  .tags, .formal, .data, .zhu}] END as poems
+"""
+
+
+@bp.route('/api/poet/<name>')
+@cached_response
 def get_poet(name):
     clean_name = clean_author_name(name)  # 前端传入的任何名称都统一清洗
     if not clean_name:
         return jsonify({'error': '诗人姓名无效'}), 400
 
     try:
-        # 基本信息
-        poet_data = graph.run("""
-                    MATCH (p:Poet {name: $name})
-                    RETURN p.name as name, p.birth as birth, p.death as death,
-                           p.bio as bio, p.num_poems as poem_count
-                    """, {'name': clean_name}).data()[0]
-
-        # 获取本地简介数据
-        intro_df = pd.read_excel(os.path.join(current_app.root_path, '../data/introduction.xlsx'))
-        bio_row = intro_df[intro_df['author'].apply(clean_author_name) == clean_name]
-        poet_data['bio'] = bio_row['produce'].values[0] if (
-                    not bio_row.empty and len(bio_row['produce'].values) > 0) else "暂无简介"
-
-        # 迁徙路线
-        locations = graph.run("""
-            MATCH (p:Poet)-[r:VISITED]->(pl:Place)
-            WHERE p.name = $name 
-            RETURN pl.name as name, pl.lat as lat, pl.lon as lon,
-                   r.year as year, r.event as event
-            ORDER BY r.year
-            """, {'name': name}).data()
-
-        # 社交网络
-        relations = graph.run("""
-                   MATCH (p:Poet {name: $name})-[:FRIEND_OF]-(friend:Poet)
-                   RETURN DISTINCT friend.name as name
-                   ORDER BY friend.name
-               """, {'name': clean_name}).data()
-
-        # 代表作品
-        poems = graph.run("""
-            MATCH (p:Poet {name: $name})-[:WROTE]->(poem:Poem)
-            RETURN poem.title as title,
-                   poem.content as content,
-                   poem.trans_content as trans_content,
-                   poem.appear as appear,
-                   poem.background as background,
-                   poem.tags as tags,  
-                   poem.formal as formal,
-                   poem.data as data,
-                   poem.zhu as zhu
-            LIMIT 5
-        """, {'name': name}).data()
-
-        # 详细简介
-        bio_response = requests.get(f'http://localhost:5001/api/poet_bio/{name}')
-        poet_data['bio'] = bio_response.json()['bio'] if bio_response.ok else "暂无简介"
+        # 基本信息、迁徙路线、社交网络、代表作品一次往返取回
+        rows = graph.run(POET_PROFILE_QUERY, {'name': clean_name}).data()
+        if not rows:
+            return jsonify({'error': f'未找到诗人：{clean_name}'}), 404
+        profile = rows[0]
+
+        poet_data = {key: profile[key] for key in ('name', 'birth', 'death', 'bio', 'poem_count')}
+        # 与原 ORDER BY r.year 一致：无年份的记录排在最后
+        locations = poet_batch.sort_locations(profile['locations'])
+        relations = sorted(set(friend for friend in profile['relations'] if friend))
+        poems = profile['poems']
+
+        # 详细简介（直接读取内存索引，不再回环请求 /api/poet_bio）
+        try:
+            poet_data['bio'] = bio_store.get(clean_name, "暂无简介")
+        except FileNotFoundError:
+            poet_data['bio'] = "暂无简介"
 
         return jsonify({
             'info': poet_data,
             'locations': locations,
-            'relations': [r['name'] for r in relations],
-            'poems': poems[:1]
+            'relations': relations,
+            'poems': poems
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/api/poets/batch', methods=['GET', 'POST'])
+@cached_response
+def get_poets_batch():
+    """
+    多位诗人对比数据，一次请求取回
+    POST {"names": [...], "facets": [...]}，或 GET ?names=李白,杜甫&facets=info,imagery
+    facets 缺省时返回全部维度：info, locations, relations, annual_counts, imagery
+    """
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        names, facets = data.get('names'), data.get('facets')
+    else:
+        names = request.args.get('names', '').split(',')
+        facets = [f for f in request.args.get('facets', '').split(',') if f]
+    try:
+        names, facets = poet_batch.parse_batch(names, facets, clean_author_name)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        result = poet_batch.fetch_batch(graph, names, facets, timeline_cache, imagery_store)
+        if 'info' in facets:
+            for name in names:
+                info = result[name]['info']
+                if info is None:
+                    continue
+                # 与 /api/poet/<name> 一致：简介取自内存索引
+                try:
+                    info['bio'] = bio_store.get(name, "暂无简介")
+                except FileNotFoundError:
+                    info['bio'] = "暂无简介"
+
+        return jsonify({
+            'facets': list(facets),
+            'poets': [dict(result[name], name=name) for name in names],
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-def load_stopwords(file_path):
+# 词云渲染参数（参与缓存键计算，修改后旧缓存自动失效）
+WORDCLOUD_PARAMS = {
+    'width': 800,
+    'height': 500,
+    'background_color': 'white',
+    'max_words': 200,
+    'collocations': False,  # 防止重复词
+}
+
+# 与 WordCloud.process_text 的 r"\w[\w']*" 一致：保留单字，只去掉标点与空白
+WORDCLOUD_TOKEN = re.compile(r"\w[\w']*")
+
+wordcloud_cache = RenderCache('wordcloud', suffix='.b64')
+# (诗人, 数据版本) -> 词云 ETag，重复访问（含 304）无需再从图数据库取全部诗作
+wordcloud_etags = TTLCache(max_entries=4096, ttl=int(os.getenv('WORDCLOUD_ETAG_TTL', '3600')))
+dataset_version.on_change(wordcloud_etags.clear)
+
+WORDCLOUD_CONTENTS_QUERY = """
+MATCH (p:Poet {name: $name})-[:WROTE]->(poem)
+RETURN poem.content as content
+"""
+
+
+def wordcloud_contents(name):
+    """诗人全部诗作正文；没有诗作时抛出 ValueError"""
+    poems = graph.run(WORDCLOUD_CONTENTS_QUERY, {'name': name}).data()
+    if not poems:
+        raise ValueError("没有找到相关诗作")
+    return [p.get('content') or '' for p in poems]
+
+
+def wordcloud_etag(contents):
+    # 缓存键 = 诗作内容哈希 + 渲染参数，任一变化都会生成新键
+    return content_key(contents, dict(WORDCLOUD_PARAMS, token=WORDCLOUD_TOKEN.pattern))
+
+
+def get_word_frequencies(name, poem_contents):
     """
-    加载停用词表
-    :param file_path: 停用词表文件路径
-    :return: 停用词集合
+    读取离线词频表（precompute.py wordfreq 生成）
+    词频表缺失或与当前诗作不一致时现场分词并回写，保证结果正确
     """
-    with open(file_path, 'r', encoding='utf-8') as f:
-        stopwords = set([line.strip() for line in f.readlines()])
-    return stopwords
+    digest = word_freq.corpus_digest(poem_contents)
+    frequencies = word_freq.load_table(name, digest)
+    if frequencies is None:
+        counter = tokenizer.count(''.join(poem_contents))
+        word_freq.save_table(name, counter, digest)
+        frequencies = dict(counter)
+    return frequencies
+
+
+def render_wordcloud(frequencies, font_path):
+    """按词频渲染词云，返回 base64 编码的 PNG"""
+    # 单字（月、山、霜……）是诗词的主要意象，必须保留；纯数字按 include_numbers=False 丢弃
+    frequencies = {word: count for word, count in frequencies.items()
+                   if WORDCLOUD_TOKEN.fullmatch(word) and not word.isdigit()}
+
+    from wordcloud import WordCloud
+
+    with metrics.STEP_SECONDS.time(step='wordcloud_layout'):
+        wc = WordCloud(font_path=font_path, **WORDCLOUD_PARAMS)
+        # 直接使用词频表，请求处理中不再分词
+        wc.generate_from_frequencies(frequencies)
+        # 转换为 PIL 图像
+        image = wc.to_image()
+
+    img_io = io.BytesIO()
+    with metrics.STEP_SECONDS.time(step='wordcloud_encode'):
+        image.save(img_io, 'PNG')
+    img_io.seek(0)
+    return base64.b64encode(img_io.getvalue()).decode()
 
 
-@app.route('/wordcloud/<name>')
+@bp.route('/wordcloud/<name>')
 def generate_wordcloud(name):
     try:
         # 动态构建字体路径（关键修正）
-        font_dir = os.path.join(app.static_folder, 'fonts')
+        font_dir = os.path.join(current_app.static_folder, 'fonts')
         font_path = os.path.join(font_dir, 'simhei.ttf')
 
         # 添加路径验证
         if not os.path.isfile(font_path):
             raise FileNotFoundError(f"字体文件未找到: {font_path}")
 
-        # 生成词云（添加错误处理）
-        poems = graph.run("""
-            MATCH (p:Poet {name: $name})-[:WROTE]->(poem)
-            RETURN poem.content as content
-            """, {'name': name}).data()
-
-        if not poems:
-            raise ValueError("没有找到相关诗作")
-
-        text = ''.join([p.get('content', '') for p in poems])
-        wordlist = jieba.cut(text, cut_all=False)  # 这里使用精确模式进行分词
-
-        # 加载停用词表
-        stopwords_file = r"E:\works\old_Tang_poetry\web_app\哈工大停用词表.txt"
-        stopwords = load_stopwords(stopwords_file)
-        # 过滤无意义的词
-        filtered_wordlist = [word for word in wordlist if word not in stopwords]
-
-        # 根据诗人名字生成结果文件路径
-        result_dir = os.path.join(os.path.dirname(__file__), 'poet_segmentation_results')
-        if not os.path.exists(result_dir):
-            os.makedirs(result_dir)
-        result_file_path = os.path.join(result_dir, f'{name}_segmentation_result.txt')
-
-        # 将分词结果保存到文件
-        with open(result_file_path, 'w', encoding='utf-8') as result_file:
-            result_file.write(' '.join(filtered_wordlist))
-
-        # 将过滤后的分词结果转换为字符串
-        filtered_word_str = ' '.join(filtered_wordlist)
-
-        wc = WordCloud(
-            font_path=font_path,  # 使用验证过的路径
-            width=800,
-            height=500,
-            background_color='white',
-            max_words=200,
-            collocations=False,  # 防止重复词
-        )
-        # 手动生成并绘图（避免自动生成中的兼容问题）
-        wc.generate(filtered_word_str)
-        # 转换为 PIL 图像
-        image = wc.to_image()
-
-        img_io = io.BytesIO()
-        image.save(img_io, 'PNG')
-        img_io.seek(0)
-        return base64.b64encode(img_io.getvalue()).decode()
+        # ETag 按 (诗人, 数据版本) 记忆，只有需要渲染时才取回诗作正文
+        etag_key = (name, dataset_version.get())
+        etag = wordcloud_etags.get(etag_key)
+        contents = None
+        if etag is None:
+            contents = wordcloud_contents(name)
+            etag = wordcloud_etag(contents)
+            wordcloud_etags.set(etag_key, etag)
+        if etag in request.if_none_match:
+            return '', 304, {'ETag': f'"{etag}"'}
+
+        encoded = wordcloud_cache.get(etag)
+        if encoded is None and contents is None:
+            # 渲染前按最新正文重算 ETag，避免用记忆的旧键保存新内容
+            contents = wordcloud_contents(name)
+            etag = wordcloud_etag(contents)
+            wordcloud_etags.set(etag_key, etag)
+            encoded = wordcloud_cache.get(etag)
+        if encoded is None:
+            encoded = render_wordcloud(get_word_frequencies(name, contents), font_path)
+            wordcloud_cache.put(etag, encoded)
+
+        response = make_response(encoded)
+        response.set_etag(etag)
+        return response
 
     except Exception as e:
         print(f"生成词云失败: {str(e)}")
+        from PIL import Image, ImageDraw, ImageFont
+
         img = Image.new('RGB', (800, 500), color=(255, 255, 255))
         draw = ImageDraw.Draw(img)
         try:
@@ -299,369 +452,249 @@ def generate_wordcloud(name):
         return base64.b64encode(img_io.getvalue()).decode()
 
 
-@app.route('/api/poet_bio/<name>')
+@bp.route('/api/poet_bio/<name>')
+@cached_response
 def get_poet_bio(name):
     try:
-        # 动态获取数据路径（关键修正）
-        data_dir = os.path.join(current_app.root_path, '..', 'data')
-        file_path = os.path.join(data_dir, 'introduction.xlsx')
-
-        # 添加路径验证
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"数据文件不存在：{file_path}")
-
-        df = pd.read_excel(file_path)
-        bio = df[df['author'] == name]['produce'].values[0]
+        bio = bio_store.get(name)
+        if bio is None:
+            return jsonify({'error': f"未找到诗人简介：{name}"}), 404
         return jsonify({'bio': bio})
     except Exception as e:
         return jsonify({'error': str(e)}), 404
 
 
-@app.route('/api/poet_network/<name>')
+@bp.route('/api/poet_network/<name>')
+@cached_response
 def get_poet_network(name):
+    """
+    诗人社交网络
+    ?depth=1-3 扩展跳数，?degree_cap= 第二跳起每节点好友上限（中心诗人的好友全部返回），
+    ?max_nodes= 节点总数上限，任一上限生效时 truncated 为 true；
+    ?layout=1 附带服务端预计算的布局坐标 (x, y ∈ [0, 1])
+    """
     try:
-        # 查询诗人社交关系
-        query = """
-               MATCH (p:Poet {name: $name})-[r:FRIEND_OF]-(other)
-               WHERE other.name IS NOT NULL AND other.name <> $name
-               RETURN p.name as source, 
-                      other.name as target, 
-                      type(r) as relationship
-               """
-        result = graph.run(query, {'name': name}).data()
+        depth = min(max(request.args.get('depth', 1, type=int), 1), MAX_DEPTH)
+        degree_cap = min(max(request.args.get('degree_cap', 30, type=int), 1), 100)
+        max_nodes = min(max(request.args.get('max_nodes', 200, type=int), 1), 500)
+        with_layout = request.args.get('layout', '0') == '1'
+
+        # 查询诗人社交关系（结果由 cached_response 按参数缓存）
+        nodes, links, truncated = expand_network(graph, name, depth, degree_cap, max_nodes)
+        if not links:
+            nodes = {}
 
         # 构造D3.js所需数据格式
-        nodes = set()
-        links = []
-        for row in result:
-            nodes.add(row['source'])
-            nodes.add(row['target'])
-            links.append({
-                'source': row['source'],
-                'target': row['target'],
-                'type': row['relationship']
-            })
+        node_list = [{'id': node, 'label': node, 'depth': hop} for node, hop in nodes.items()]
+        if with_layout and node_list:
+            coords = force_layout(list(nodes), links)
+            for node, (x, y) in zip(node_list, coords.tolist()):
+                node.update(x=round(x, 4), y=round(y, 4))
 
         return jsonify({
-            'nodes': [{'id': node, 'label': node} for node in nodes],
-            'links': links
+            'nodes': node_list,
+            'links': [{'source': s, 'target': t, 'type': rel} for s, t, rel in links],
+            'truncated': truncated
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/search_poem', methods=['GET'])
-def search_poem():
+@bp.route('/api/poet_metrics/<name>')
+@cached_response
+def get_poet_metrics(name):
+    """诗人在好友网络中的中心性与社区指标"""
     try:
-        title_keyword = request.args.get('title', '').strip()
-        author = request.args.get('author', '').strip()
-
-        query = """
-            MATCH (poet:Poet {name: $author})-[:WROTE]->(poem:Poem)
-            WHERE toLower(poem.title) CONTAINS toLower($title_keyword)
-            RETURN poem.title as title,
-                   poem.content as content,
-                   poem.trans_content as trans_content,
-                   poem.appear as appear,
-                   poem.background as background,
-                   poem.tags as tags,
-                   poem.formal as formal,
-                   poem.data as data,
-                   poem.zhu as zhu
-        """
-        results = graph.run(query, {'author': author, 'title_keyword': title_keyword}).data()
-        return jsonify(results)
+        poet_metrics = analytics.metrics(clean_author_name(name))
+        if poet_metrics is None:
+            return jsonify({'error': f'未找到诗人：{name}'}), 404
+        return jsonify(poet_metrics)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/poet_heatmap_data/<name>')  # 密度热力图
-def get_heatmap_data(name):
+# search_poem 可投影的字段
+POEM_FIELDS = ('author', 'title', 'content', 'trans_content', 'appear', 'background',
+               'tags', 'formal', 'data', 'zhu')
+
+
+def paged_search(project, default_limit):
+    """
+    走内存 n-gram 索引检索并分页；结果由视图上的 cached_response 缓存
+    author 为空时跨全部作者；?in=title,content 可同时匹配正文（默认仅标题）
+    :param project: (诗作 dict, 投影字段) -> 返回项
+    """
+    title_keyword = request.args.get('title', '').strip()
+    author = request.args.get('author', '').strip()
     try:
-        query = """
-        MATCH (:Poet {name: $name})-[:WROTE]->(poem)
-        MATCH (poet)-[v:VISITED]->(place)
-        RETURN place.lat as lat, place.lon as lon, count(poem) as intensity
-        """
-        results = graph.run(query, {'name': name}).data()
-        return jsonify([dict(r) for r in results])
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        offset, limit = page_params(request.args, default_limit=default_limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    in_fields = tuple(f for f in request.args.get('in', 'title').split(',') if f in SEARCH_FIELDS) or ('title',)
+    fields = tuple(f for f in request.args.get('fields', '').split(',') if f in POEM_FIELDS) or POEM_FIELDS
 
+    index = poem_index.get()
+    poem_ids = index.search(title_keyword, author or None, in_fields)
+    rows = poem_index.with_details([index.get(poem_id) for poem_id in poem_ids[offset:offset + limit]], fields)
+    page = [project(row, fields) for row in rows]
+    return jsonify(page), 200, page_headers(offset, limit, len(poem_ids))
 
-@app.route('/api/poet_annual_counts/<name>')
-def get_annual_counts(name):
+
+@bp.route('/api/search_poem', methods=['GET'])
+@cached_response
+def search_poem():
     try:
-        query = """
-        MATCH (p:Poet {name: $name})-[:YEARLY_OUTPUT]->(ac:AnnualCount)
-        RETURN ac.year AS year, ac.count AS count
-        ORDER BY ac.year
-        """
-        results = graph.run(query, {'name': name}).data()
-        return jsonify([dict(r) for r in results])
+        # ?fields=title,content 只返回所需字段，默认返回全部
+        return paged_search(lambda poem, fields: {f: poem.get(f) for f in fields}, default_limit=20)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/search_poem_titles', methods=['GET'])
-def search_poem_titles():
+@bp.route('/api/poet_heatmap_data/<name>')  # 密度热力图
+@cached_response
+def get_heatmap_data(name):
     try:
-        title_keyword = request.args.get('title', '').strip()
-        author = request.args.get('author', '').strip()
-
-        query = """
-            MATCH (poet:Poet {name: $author})-[:WROTE]->(poem:Poem)
-            WHERE toLower(poem.title) CONTAINS toLower($title_keyword)
-            RETURN poem.title as title
-        """
-        results = graph.run(query, {'author': author, 'title_keyword': title_keyword}).data()
-        titles = [row['title'] for row in results]
-        return jsonify(titles)
+        results = heatmap_rows(graph, name)
+        return jsonify([dict(r) for r in results])
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-    # 新增历史时期统计接口
-    @app.route('/api/poet_anshi_periods/<name>')
-    def get_anshi_periods(name):
-        def calc_period(start, end):
-            query = f"""
-            MATCH (p:Poet {{name: '{name}'}})-[:YEARLY_OUTPUT]->(ac:AnnualCount)
-            WHERE ac.year >= {start} AND ac.year < {end}
-            RETURN sum(ac.count) as total
-            """
-            return graph.run(query).evaluate()
 
-        return jsonify({
-            "pre_anshi": calc_period(750, 755),  # 安史之乱前
-            "mid_anshi": calc_period(755, 757),  # 动乱中期
-            "post_anshi": calc_period(757, 763)  # 战后恢复期
-        })
-
-    # 新增官职时期对比接口
-    @app.route('/api/poet_office_periods/<name>')
-    def get_office_periods(name):
-        # 预设诗人官职时期（需根据实际情况维护）
-        periods = {
-            '李白': [{'type': '在任', 'start': 742, 'end': 744}],
-            '杜甫': [{'type': '在任', 'start': 755, 'end': 759}],
-            '王维': [{'type': '在任', 'start': 720, 'end': 728}],
-            '白居易': [{'type': '在任', 'start': 800, 'end': 842}],
-        }
-
-        results = []
-        for p in periods.get(name, []):
-            query = f"""
-            MATCH (:`Poet` {{name: '{name}'}})-[:YEARLY_OUTPUT]->(ac) 
-            WHERE ac.year >= {p['start']} AND ac.year < {p['end']} 
-            RETURN sum(ac.count) as count
-            """
-            results.append({
-                'period': f"{p['start']}-{p['end']}",
-                'type': p['type'],
-                'count': graph.run(query).evaluate()
-            })
-
-        # 补充在野时期数据
-        query = f"""
-        MATCH (:Poet {{name: '{name}'}})-[:YEARLY_OUTPUT]->(ac) 
-        RETURN sum(ac.count) - {sum([x['count'] for x in results])}
-        """
-        results.append({
-            'period': '其他年份',
-            'type': '在野',
-            'count': graph.run(query).evaluate()
-        })
-
-        return jsonify(results)
-
-    # 在原路由下方添加
-
-    @app.route('/api/poet_anshi_periods/<name>')
-    def get_anshi_periods(name):
-        """获取安史之乱时期总产量"""
-        clean_name = clean_author_name(name)
+@bp.route('/api/geo/clusters')
+@cached_response
+def get_geo_clusters():
+    """
+    足迹网格聚合：?zoom=0..12，?bbox=min_lon,min_lat,max_lon,max_lat，?poet= 仅看某位诗人
+    """
+    zoom = request.args.get('zoom', 5, type=int)
+    if not 0 <= zoom <= MAX_ZOOM:
+        return jsonify({'error': f'zoom 应在 0-{MAX_ZOOM} 之间'}), 400
+    bbox = None
+    if request.args.get('bbox'):
+        try:
+            bbox = parse_bbox(request.args['bbox'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    poet = request.args.get('poet', '').strip()
 
-        # 计算各阶段总产量
-        def sum_period(start, end):
-            query = """
-            MATCH (p:Poet {name: $name})-[:YEARLY_OUTPUT]->(ac:AnnualCount)
-            WHERE ac.year >= $start AND ac.year < $end
-            RETURN sum(ac.count) as total
-            """
-            result = graph.run(query, {'name': clean_name, 'start': start, 'end': end}).data()
-            return result[0]['total'] if result else 0
+    try:
+        clusters = geo_clusters.clusters(zoom, bbox, clean_author_name(poet) if poet else None)
+        return jsonify({'zoom': zoom, 'clusters': clusters})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        return jsonify({
-            "pre_anshi": sum_period(750, 755),
-            "mid_anshi": sum_period(755, 757),
-            "post_anshi": sum_period(757, 763)
-        })
 
-    @app.route('/api/poet_office_periods/<name>')
-    def get_office_periods(name):
-        """获取仕途时期总产量"""
-        clean_name = clean_author_name(name)
+@bp.route('/api/poet_annual_counts/<name>')
+@cached_response
+def get_annual_counts(name):
+    try:
+        series = timeline_cache.get(clean_author_name(name))
+        return jsonify(series.rows)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        # 查询在任期间总作品量
-        office_query = """
-        MATCH (p:Poet {name: $name})-[:YEARLY_OUTPUT]->(ac)
-        WHERE ac.year IN [742,755,806]  # 示例年份，需根据实际数据调整
-        RETURN sum(ac.count) as office_total
-        """
-        office_total = graph.run(office_query, {'name': clean_name}).data()[0].get('office_total', 0)
-
-        # 总作品量
-        total_query = """
-        MATCH (p:Poet {name: $name})-[:YEARLY_OUTPUT]->(ac)
-        RETURN sum(ac.count) as total
-        """
-        total = graph.run(total_query, {'name': clean_name}).data()[0].get('total', 0)
 
-        return jsonify({
-            "office": office_total,
-            "non_office": total - office_total
-        })
+@bp.route('/api/search_poem_titles', methods=['GET'])
+@cached_response
+def search_poem_titles():
+    try:
+        return paged_search(lambda poem, fields: poem['title'], default_limit=10)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 
 # 安史之乱时期统计 API
-@app.route('/api/poet_anshi_periods/<name>')
+@bp.route('/api/poet_anshi_periods/<name>')
+@cached_response
 def get_anshi_periods(name):
     # 统一姓名处理
-    clean_name = clean_author_name(name)
-
-    # 各时期范围定义
-    periods = [
-        {'name': 'pre', 'start': 750, 'end': 755},  # 安史之乱前
-        {'name': 'mid', 'start': 755, 'end': 757},  # 动乱中期
-        {'name': 'post', 'start': 757, 'end': 763}  # 恢复期
-    ]
-
-    results = {}
-    for p in periods:
-        query = """
-        MATCH (p:Poet {name: $name})-[:YEARLY_OUTPUT]->(ac:AnnualCount)
-        WHERE ac.year >= $start AND ac.year <= $end
-        RETURN sum(ac.count) as total
-        """
-        result = graph.run(query, {'name': clean_name, 'start': p['start'], 'end': p['end']}).data()
-        results[p['name'] + '_anshi'] = result[0]['total'] if result else 0
-
-    return jsonify(results)
+    series = timeline_cache.get(clean_author_name(name))
+    return jsonify(anshi_stats(series))
 
 
 # 仕途时期统计 API
-@app.route('/api/poet_office_periods/<name>')
+@bp.route('/api/poet_office_periods/<name>')
+@cached_response
 def get_office_periods(name):
     clean_name = clean_author_name(name)
+    series = timeline_cache.get(clean_name)
+    return jsonify(office_stats(series, clean_name))
 
-    # 任职时期手册数据（需要维护）
-    official_years = {
-        '李白': [742, 743, 744],
-        '杜甫': [755, 756, 757, 758, 759],
-        '王维': [721, 722, 723, 724, 756],
-        '白居易': [806, 807, 808, 809, 810]
-    }
 
-    # 在任期间作品数
-    query_in_office = """
-    MATCH (p:Poet {name: $name})-[:YEARLY_OUTPUT]->(ac)
-    WHERE ac.year IN $years
-    RETURN sum(ac.count) as total
-    """
-    office_total = graph.run(query_in_office,
-                             {'name': clean_name, 'years': official_years.get(clean_name, [])}
-                             ).data()[0]['total']
-
-    # 总作品数
-    query_total = """
-    MATCH (p:Poet {name: $name})-[:YEARLY_OUTPUT]->(ac)
-    RETURN sum(ac.count) as total
-    """
-    all_total = graph.run(query_total, {'name': clean_name}).data()[0]['total']
-
-    return jsonify([
-        {  # 转换为数组格式
-            "period": "",
-            "type": "在任",
-            "count": office_total
-        },
-        {
-            "period": "",
-            "type": "在野",
-            "count": all_total - office_total
+# 时间线综合统计：逐年序列只查询一次，各时期在内存中求和
+@bp.route('/api/poet_timeline_stats/<name>')
+@cached_response
+def get_timeline_stats(name):
+    try:
+        clean_name = clean_author_name(name)
+        series = timeline_cache.get(clean_name)
+        stats = {
+            'annual_counts': series.rows,
+            'total': series.total,
+            'anshi': anshi_stats(series),
+            'office': office_stats(series, clean_name),
         }
-    ])
+
+        # 可选自定义时期：?periods=750-755,757-763（起止年份均含）
+        raw_periods = request.args.get('periods', '')
+        if raw_periods:
+            try:
+                periods = parse_periods(raw_periods)
+            except ValueError:
+                return jsonify({'error': '时期格式应为 起始年-结束年，以逗号分隔'}), 400
+            sums = series.range_sums([start for start, _ in periods], [end for _, end in periods])
+            stats['custom'] = [{'period': f'{start}-{end}', 'count': total}
+                               for (start, end), total in zip(periods, sums)]
+
+        return jsonify(stats)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/poem_imagery')
+@bp.route('/api/poem_imagery')
+@cached_response
 def get_poem_imagery():
     """获取意象分析数据"""
     poet = request.args.get('poet', '白居易')
 
-    # Cypher查询
-    query = """
-    MATCH (p:Poet {name:$name})-[:WROTE]->(poem)-[:CONTAINS_IMAGE]->(img)
-    RETURN img.name as image, count(*) as freq
-    ORDER BY freq DESC
-    LIMIT 50
-    """
-    result = graph.run(query, name=poet).data()
-    return jsonify([dict(item) for item in result])
+    ranking = imagery_store.top_images(poet, limit=50)
+    return jsonify([{'image': image, 'freq': freq} for image, freq in ranking])
 
 
-@app.route('/api/imagery_cloud')
+@bp.route('/api/imagery_cloud')
+@cached_response
 def generate_cloud():
     poet = request.args.get('poet', 'all')
-    query = """
-        MATCH (:Poet {name:$name})-[:WROTE]->()
-        -[:CONTAINS_IMAGE]->(i)
-        RETURN i.name as name, count(*) as value 
-        ORDER BY value DESC LIMIT 50
-    """ if poet != 'all' else """
-        MATCH (i:Image) 
-        RETURN i.name as name, count(*) as value 
-        ORDER BY value DESC LIMIT 100
-    """
-    data = graph.run(query, name=poet).data()
-    return jsonify([{'name': d['name'], 'value': d['value']} for d in data])  # 频率放大
+    if poet != 'all':
+        ranking = imagery_store.top_images(poet, limit=50)
+        return jsonify([{'name': name, 'value': value} for name, value in ranking])
+
+    # 全库排行：读取计数表中的全库表，不再查询图
+    ranking = imagery_store.global_ranking(limit=100)
+    return jsonify([{'name': name, 'value': value} for name, value in ranking])
+
 
+# 预设时期条件 -> [起始年, 结束年)
+PERIOD_CONDITIONS = {
+    'year < 755': (None, 755),
+    'year >= 755': (755, None)
+}
 
-@app.route('/api/period_imagery/<name>')
+
+@bp.route('/api/period_imagery/<name>')
+@cached_response
 def get_period_imagery(name):
     try:
-        # 安全处理查询条件
-        condition_map = {
-            'year < 755': "poem.year < 755",
-            'year >= 755': "poem.year >= 755"
-        }
-        raw_cond = request.args.get('cond', '')
-        safe_cond = condition_map.get(raw_cond, "TRUE")
-
-        # 参数化查询(关键修正)
-        query = f"""
-        MATCH (p:Poet {{name: $name}})-[:WROTE]->(poem)
-        WHERE {safe_cond}
-        MATCH (poem)-[:CONTAINS_IMAGE]->(img)
-        RETURN img.name as name, count(*) as value
-        ORDER BY value DESC
-        LIMIT 40
-        """
-
-        # 打印调试查询语句
-        print(f"[DEBUG] Executing query:\n{query}")
-
-        results = graph.run(query, {'name': clean_author_name(name)}).data()
-
-        # 数据有效性检查
-        valid_data = []
-        for r in results:
-            if isinstance(r['name'], str) and isinstance(r['value'], int):
-                valid_data.append({
-                    'name': r['name'].strip(),
-                    'value': r['value'] * 2  # 保持与之前相同的放大系数
-                })
-
-        return jsonify(valid_data)
+        # 任意年份区间：?start=750&end=763（起含止不含）；兼容原有 cond 参数
+        start, end = PERIOD_CONDITIONS.get(request.args.get('cond', ''), (None, None))
+        start = request.args.get('start', start, type=int)
+        end = request.args.get('end', end, type=int)
+
+        ranking = imagery_store.top_images(clean_author_name(name), limit=40, start=start, end=end)
+        return jsonify([{
+            'name': image,
+            'value': value * 2  # 保持与之前相同的放大系数
+        } for image, value in ranking])
 
     except Exception as e:
         import traceback
@@ -670,4 +703,4 @@ def get_period_imagery(name):
 
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5001)
\ No newline at end of file
+    create_app().run(debug=True, port=5001)
\ No newline at end of file
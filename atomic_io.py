@@ -0,0 +1,83 @@
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+
+@contextmanager
+def atomic_open(path, mode='wb'):
+    """
+    写入同目录下的临时文件，正常退出时原子替换 path，出错时删除临时文件
+    读者只会看到旧文件或完整的新文件
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode, encoding=None if 'b' in mode else 'utf-8') as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_atomic(path, data):
+    """原子写入 str（UTF-8）或 bytes"""
+    with atomic_open(path, 'wb' if isinstance(data, bytes) else 'w') as f:
+        f.write(data)
+
+
+def save_npz(path, arrays):
+    """以压缩 npz 原子保存数组字典"""
+    with atomic_open(path) as f:
+        np.savez_compressed(f, **arrays)
+
+
+def load_npz(path):
+    """读取 npz 为数组字典（全部读入内存）"""
+    with np.load(path) as table:
+        return {key: table[key] for key in table.files}
+
+
+class NpzSnapshot:
+    """
+    由 npz 文件支撑的只读快照
+    文件缺失时调用 export 生成一次；mtime 变化时重新读取，经 build 加工后整体替换，
+    读者拿到的始终是同一版本的完整快照
+    :param export: 无参函数，返回待保存的数组字典
+    :param build: 数组字典 -> 快照对象（索引、偏移量等派生数据在此一并算好）
+    :param on_reload: 每次重新读取后调用
+    """
+
+    def __init__(self, path, export, build=None, on_reload=None):
+        self.path = path
+        self.export = export
+        self.build = build or (lambda arrays: arrays)
+        self.on_reload = on_reload
+        self._lock = threading.Lock()
+        # (mtime, 快照)
+        self._current = (None, None)
+
+    def save(self, arrays):
+        save_npz(self.path, arrays)
+
+    def get(self):
+        if not os.path.exists(self.path):
+            with self._lock:
+                if not os.path.exists(self.path):
+                    self.save(self.export())
+
+        mtime = os.path.getmtime(self.path)
+        current = self._current
+        if current[0] == mtime:
+            return current[1]
+        with self._lock:
+            if self._current[0] != mtime:
+                self._current = (mtime, self.build(load_npz(self.path)))
+                if self.on_reload is not None:
+                    self.on_reload()
+            return self._current[1]
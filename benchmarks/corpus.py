@@ -0,0 +1,105 @@
+"""
+合成唐诗语料：诗人、诗作、地点、意象、好友关系与逐年作品数
+同一 seed 生成的语料完全一致，便于不同提交之间对比基准结果
+"""
+import random
+
+SURNAMES = '李杜王白孟韩柳刘元岑高贾温罗张崔韦钱卢'
+GIVEN_CHARS = '白甫维居易浩然愈宗禹锡稹参适岛庭筠商隐牧之龄昌龟蒙建籍郊翰颢'
+
+IMAGES = ['明月', '秋风', '杨柳', '孤舟', '落日', '青山', '白云', '流水', '梅花', '酒',
+          '归雁', '芳草', '烟雨', '长亭', '寒山', '春水', '夕阳', '松', '竹', '菊',
+          '蝉', '杜鹃', '桃花', '关山', '边塞', '故园', '霜', '雪', '江枫', '渔火']
+
+FILLER_CHARS = '天地人山水风花雪月春秋日夜云江河长亭客行归来去不见无有一何处相思故乡'
+
+# 唐代主要城市（名称, 纬度, 经度）
+PLACES = [
+    ('长安', 34.27, 108.95), ('洛阳', 34.62, 112.45), ('扬州', 32.39, 119.42),
+    ('成都', 30.66, 104.06), ('江陵', 30.35, 112.19), ('金陵', 32.06, 118.80),
+    ('杭州', 30.27, 120.15), ('苏州', 31.30, 120.62), ('太原', 37.87, 112.55),
+    ('幽州', 39.90, 116.40), ('凉州', 37.93, 102.64), ('夔州', 31.02, 109.53),
+    ('岳州', 29.36, 113.13), ('洪州', 28.68, 115.86), ('越州', 30.00, 120.58),
+    ('襄阳', 32.01, 112.14), ('桂州', 25.27, 110.29), ('广州', 23.13, 113.26),
+    ('潭州', 28.20, 112.97), ('汴州', 34.80, 114.31),
+]
+
+EVENTS = ['游历', '赴任', '贬谪', '送别', '隐居']
+
+
+def _unique_names(rng, count):
+    names = []
+    seen = set()
+    while len(names) < count:
+        name = rng.choice(SURNAMES) + ''.join(rng.choice(GIVEN_CHARS) for _ in range(rng.choice((1, 2))))
+        if name in seen:
+            # 组合用尽时加序号，保证任意规模下姓名唯一
+            name = f'{name}{len(names)}'
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+def _verse(rng, images):
+    line_length = rng.choice((5, 7))
+    lines = []
+    for _ in range(4):
+        line = rng.choice(images) if images and rng.random() < 0.6 else ''
+        while len(line) < line_length:
+            line += rng.choice(FILLER_CHARS)
+        lines.append(line[:line_length])
+    return '，'.join(lines[:2]) + '。' + '，'.join(lines[2:]) + '。'
+
+
+def generate_corpus(num_poets, poems_per_poet=20, friends_per_poet=4, visits_per_poet=6, seed=0):
+    """
+    :return: {'poets', 'poems', 'places', 'visits', 'friends'}
+             poems 中每首含 author/title/content/year/images；friends 为 (a, b) 且 a < b
+    """
+    rng = random.Random(seed)
+    names = _unique_names(rng, num_poets)
+
+    poets = []
+    poems = []
+    visits = []
+    for name in names:
+        birth = rng.randint(650, 820)
+        death = birth + rng.randint(35, 75)
+        count = max(1, int(rng.expovariate(1 / poems_per_poet)))
+        for i in range(count):
+            images = rng.sample(IMAGES, rng.randint(1, 4))
+            poems.append({
+                'author': name,
+                'title': f'{rng.choice(images)}{rng.choice(("吟", "行", "怀古", "送别", "夜思"))}其{i + 1}',
+                'content': _verse(rng, images),
+                'trans_content': '',
+                'appear': '',
+                'background': '',
+                'tags': rng.choice(('山水', '边塞', '送别', '咏物', '怀古')),
+                'formal': rng.choice(('五言绝句', '七言绝句', '五言律诗', '七言律诗')),
+                'data': '',
+                'zhu': '',
+                # 约一成诗作年份不详
+                'year': rng.randint(birth + 15, death) if rng.random() > 0.1 else None,
+                'images': images,
+            })
+        for _ in range(visits_per_poet):
+            place = rng.choice(PLACES)[0]
+            visits.append((name, place, rng.randint(birth + 15, death), rng.choice(EVENTS)))
+        poets.append({'name': name, 'birth': birth, 'death': death, 'num_poems': count,
+                      'bio': f'{name}，唐代诗人。'})
+
+    friends = set()
+    for name in names:
+        for _ in range(friends_per_poet // 2):
+            other = names[rng.randrange(num_poets)]
+            if other != name:
+                friends.add(tuple(sorted((name, other))))
+
+    return {
+        'poets': poets,
+        'poems': poems,
+        'places': [{'name': n, 'lat': lat, 'lon': lon} for n, lat, lon in PLACES],
+        'visits': visits,
+        'friends': sorted(friends),
+    }
@@ -0,0 +1,212 @@
+"""
+内存中的 Neo4j 替身：按查询语句中的特征片段分派到对应的处理函数
+只覆盖应用实际发出的查询；新查询用 FakeGraph.handles 注册即可
+"""
+import time
+from collections import Counter, defaultdict
+
+
+class FakeCursor:
+    """接口与 py2neo Cursor 的常用部分一致"""
+
+    def __init__(self, rows):
+        self._rows = rows
+
+    def data(self):
+        return self._rows
+
+    def evaluate(self):
+        if not self._rows:
+            return None
+        return next(iter(self._rows[0].values()), None)
+
+    def plan(self):
+        return None
+
+    def __iter__(self):
+        return iter(self._rows)
+
+
+class FakeGraph:
+    """
+    :param corpus: benchmarks.corpus.generate_corpus 的返回值
+    :param latency: 每次查询额外等待的秒数，模拟网络往返
+    """
+
+    # [(查询特征片段, 处理函数)]，多个片段命中时取最长（最具体）的一个
+    handlers = []
+
+    def __init__(self, corpus, latency=0.0):
+        self.latency = latency
+        self.calls = Counter()
+        self.poets = {p['name']: p for p in corpus['poets']}
+        self.places = {p['name']: p for p in corpus['places']}
+        self.poems = corpus['poems']
+        self.poems_by_author = defaultdict(list)
+        for poem in self.poems:
+            self.poems_by_author[poem['author']].append(poem)
+        self.visits_by_poet = defaultdict(list)
+        for poet, place, year, event in corpus['visits']:
+            self.visits_by_poet[poet].append({'place': place, 'year': year, 'event': event})
+        self.friends = corpus['friends']
+        self.friends_of = defaultdict(set)
+        for a, b in self.friends:
+            self.friends_of[a].add(b)
+            self.friends_of[b].add(a)
+
+    @classmethod
+    def handles(cls, marker):
+        """注册装饰器：查询语句包含 marker 时由被装饰函数处理"""
+        def decorator(fn):
+            cls.handlers.append((marker, fn))
+            return fn
+        return decorator
+
+    def run(self, query, parameters=None, **kwparameters):
+        parameters = dict(parameters or {}, **kwparameters)
+        matches = [(len(marker), handler) for marker, handler in self.handlers if marker in query]
+        if not matches:
+            raise NotImplementedError(f"FakeGraph 未支持的查询：{' '.join(query.split())[:80]}")
+        handler = max(matches, key=lambda match: match[0])[1]
+        self.calls[handler.__name__] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return FakeCursor(handler(self, **parameters))
+
+    def annual_counts(self, name):
+        counts = Counter(p['year'] for p in self.poems_by_author.get(name, ()) if p['year'] is not None)
+        return [{'year': year, 'count': counts[year]} for year in sorted(counts)]
+
+    def heat(self, name):
+        counts = Counter(v['place'] for v in self.visits_by_poet.get(name, ()))
+        return [{'lat': self.places[place]['lat'], 'lon': self.places[place]['lon'], 'intensity': n}
+                for place, n in counts.items()]
+
+
+POEM_PROPERTIES = ('title', 'content', 'trans_content', 'appear', 'background',
+                   'tags', 'formal', 'data', 'zhu')
+
+
+@FakeGraph.handles('RETURN 1')
+def health(graph):
+    return [{'1': 1}]
+
+
+@FakeGraph.handles('p.bio as bio')
+def poet_profile(graph, name):
+    poet = graph.poets.get(name)
+    if poet is None:
+        return []
+    return [{
+        'name': poet['name'], 'birth': poet['birth'], 'death': poet['death'],
+        'bio': poet['bio'], 'poem_count': poet['num_poems'],
+        'locations': [{'name': v['place'], 'lat': graph.places[v['place']]['lat'],
+                       'lon': graph.places[v['place']]['lon'], 'year': v['year'], 'event': v['event']}
+                      for v in graph.visits_by_poet.get(name, ())],
+        'relations': sorted(graph.friends_of.get(name, ())),
+        'poems': [{key: poem[key] for key in POEM_PROPERTIES}
+                  for poem in graph.poems_by_author.get(name, ())[:1]],
+    }]
+
+
+@FakeGraph.handles('RETURN poem.content as content')
+def poet_contents(graph, name):
+    return [{'content': poem['content']} for poem in graph.poems_by_author.get(name, ())]
+
+
+@FakeGraph.handles('id(poem) as id')
+def all_poems(graph):
+    return [{'id': poem_id, 'author': poem['author'], 'title': poem['title'], 'content': poem['content']}
+            for poem_id, poem in enumerate(graph.poems)]
+
+
+@FakeGraph.handles('UNWIND $ids AS poem_id')
+def poem_details(graph, ids):
+    return [{'poem_id': poem_id,
+             'details': {key: graph.poems[poem_id][key] for key in POEM_PROPERTIES
+                         if key not in ('title', 'content')}}
+            for poem_id in ids if 0 <= poem_id < len(graph.poems)]
+
+
+@FakeGraph.handles('p.num_poems as count')
+def poet_counts(graph):
+    return [{'name': p['name'], 'count': p['num_poems']} for p in graph.poets.values()]
+
+
+@FakeGraph.handles('RETURN DISTINCT a.name as source')
+def friend_edges(graph):
+    return [{'source': a, 'target': b} for a, b in graph.friends]
+
+
+@FakeGraph.handles('UNWIND $frontier')
+def expand_frontier(graph, frontier, cap):
+    rows = []
+    for name in frontier:
+        friends = sorted(graph.friends_of.get(name, ()),
+                         key=lambda other: (-graph.poets[other]['num_poems'], other))
+        if friends:
+            rows.append({'source': name, 'degree': len(friends),
+                         'friends': [{'name': f, 'type': 'FRIEND_OF'} for f in friends[:cap]]})
+    return rows
+
+
+@FakeGraph.handles('[h:HEAT]->(place:Place)')
+def heat_projection(graph, name):
+    return graph.heat(name)
+
+
+@FakeGraph.handles('[v:VISITED]->(place:Place)')
+def heat_live(graph, name):
+    return graph.heat(name)
+
+
+@FakeGraph.handles('YEARLY_OUTPUT')
+def annual_counts(graph, name):
+    return graph.annual_counts(name)
+
+
+@FakeGraph.handles('count(*) as freq')
+def imagery_export(graph):
+    counts = Counter((p['author'], p['year'], image) for p in graph.poems for image in p['images'])
+    return [{'poet': poet, 'year': year, 'image': image, 'freq': n}
+            for (poet, year, image), n in counts.items()]
+
+
+@FakeGraph.handles('[:CONTAINS_IMAGE]->(i:Image)')
+def imagery_global(graph):
+    counts = Counter(image for p in graph.poems for image in p['images'])
+    return [{'image': image, 'freq': n} for image, n in counts.items()]
+
+
+@FakeGraph.handles('count(v) as visits')
+def geo_export(graph):
+    counts = Counter((poet, v['place']) for poet, visits in graph.visits_by_poet.items() for v in visits)
+    return [{'poet': poet, 'place': place, 'lat': graph.places[place]['lat'],
+             'lon': graph.places[place]['lon'], 'visits': n}
+            for (poet, place), n in counts.items()]
+
+
+@FakeGraph.handles('p.name as poet_name')
+def batch_info(graph, names):
+    return [{'name': name, 'poet_name': name, 'birth': graph.poets[name]['birth'],
+             'death': graph.poets[name]['death'], 'bio': graph.poets[name]['bio'],
+             'poem_count': graph.poets[name]['num_poems']}
+            for name in names if name in graph.poets]
+
+
+@FakeGraph.handles('UNWIND $names AS name\nMATCH (:Poet {name: name})-[r:VISITED]')
+def batch_locations(graph, names):
+    return [{'name': name, 'locations': poet_profile(graph, name)[0]['locations']}
+            for name in names if graph.visits_by_poet.get(name)]
+
+
+@FakeGraph.handles('UNWIND $names AS name\nMATCH (:Poet {name: name})-[:FRIEND_OF]')
+def batch_relations(graph, names):
+    return [{'name': name, 'relations': sorted(graph.friends_of[name])}
+            for name in names if graph.friends_of.get(name)]
+
+
+@FakeGraph.handles('UNWIND $names AS name\nMATCH (p:Poet {name: name})-[:YEARLY_OUTPUT]')
+def batch_annual_counts(graph, names):
+    return [{'name': name, 'counts': graph.annual_counts(name)}
+            for name in names if graph.annual_counts(name)]
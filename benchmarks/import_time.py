@@ -0,0 +1,70 @@
+"""
+冷启动耗时基准：在全新子进程中导入 app 并创建应用，统计耗时与最慢的导入模块
+
+用法：python benchmarks/import_time.py --runs 5 --top 15 --output import_time.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STARTUP = "import app; app.create_app(warm=False)"
+
+
+def parse_importtime(stderr):
+    """解析 -X importtime 输出，返回 {模块: 累计耗时(微秒)}"""
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line.split('|', 2)
+        module = name.strip()
+        cumulative[module] = max(cumulative.get(module, 0), int(cumulative_us.strip()))
+    return cumulative
+
+
+def measure(runs):
+    timings = []
+    modules = {}
+    for _ in range(runs):
+        started = time.perf_counter()
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', STARTUP],
+                              cwd=ROOT, capture_output=True, text=True)
+        timings.append(time.perf_counter() - started)
+        if proc.returncode != 0:
+            raise RuntimeError(f"启动失败：{proc.stderr.strip().splitlines()[-1]}")
+        for module, us in parse_importtime(proc.stderr).items():
+            modules.setdefault(module, []).append(us)
+    return timings, {module: statistics.median(values) for module, values in modules.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="测量应用冷启动耗时")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help="列出耗时最多的模块数")
+    parser.add_argument('--output', help="JSON 报告路径，缺省时输出到标准输出")
+    args = parser.parse_args()
+
+    timings, modules = measure(args.runs)
+    top = sorted(modules.items(), key=lambda item: -item[1])[:args.top]
+    report = {
+        'runs': args.runs,
+        'median_seconds': round(statistics.median(timings), 4),
+        'min_seconds': round(min(timings), 4),
+        'max_seconds': round(max(timings), 4),
+        'top_modules': [{'module': module, 'cumulative_ms': round(us / 1000, 2)} for module, us in top],
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+"""
+路由基准：以合成语料和内存图替身驱动 Flask 测试客户端，
+在多个语料规模与并发度下测量各路由的吞吐量与延迟分位数
+
+用法：
+    python benchmarks/run_routes.py --sizes 200,2000 --concurrency 1,8 --requests 200 --output bench.json
+
+每个语料规模在独立子进程中运行（独立的 CACHE_DIR 与内存快照），结果汇总为一份 JSON 报告
+每个并发度开始前清空响应级缓存（cached_response 与时间线缓存），报告中记录各路由的 X-Cache 命中率；
+--uncached 时关闭这两级缓存，每个请求都实际执行路由
+仓库不附带字体与停用词表：词云字体缺省取 wordcloud 包自带的 DroidSansMono（可用 --font 指定中文字体），
+停用词表为临时生成的常见虚词，保证词云路由测到的是真实的分词与渲染，而不是失败占位图
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+# 路由名 -> 由 (随机数发生器, 样本) 生成请求路径
+ROUTES = {
+    'get_poet': lambda rng, s: f"/api/poet/{quote(rng.choice(s['poets']))}",
+    'generate_wordcloud': lambda rng, s: f"/wordcloud/{quote(rng.choice(s['poets']))}",
+    'search_poem_titles': lambda rng, s: f"/api/search_poem_titles?title={quote(rng.choice(s['keywords']))}",
+    'search_poem': lambda rng, s: f"/api/search_poem?title={quote(rng.choice(s['keywords']))}&in=title,content",
+    'period_imagery': lambda rng, s: f"/api/period_imagery/{quote(rng.choice(s['poets']))}?cond=year%20%3C%20755",
+    'poem_imagery': lambda rng, s: f"/api/poem_imagery?poet={quote(rng.choice(s['poets']))}",
+    'imagery_cloud': lambda rng, s: "/api/imagery_cloud?poet=all",
+    'timeline_stats': lambda rng, s: f"/api/poet_timeline_stats/{quote(rng.choice(s['poets']))}",
+    'heatmap': lambda rng, s: f"/api/poet_heatmap_data/{quote(rng.choice(s['poets']))}",
+    'geo_clusters': lambda rng, s: f"/api/geo/clusters?zoom={rng.randint(3, 8)}&bbox=100,20,125,45",
+    'poet_network': lambda rng, s: f"/api/poet_network/{quote(rng.choice(s['poets']))}?depth=2",
+    'poets': lambda rng, s: "/api/poets?limit=100",
+    'poets_batch': lambda rng, s: "/api/poets/batch?names=" + ','.join(quote(n) for n in rng.sample(s['poets'], 4)),
+}
+
+# 基准用停用词表（常见文言虚词与标点）
+BENCH_STOPWORDS = ['之', '乎', '者', '也', '而', '其', '以', '于', '兮', '矣', '焉', '哉',
+                   '，', '。', '、', '；', '：', '？', '！', '“', '”']
+
+
+def default_font():
+    """wordcloud 包自带的字体，不含中文字形，但排版与编码开销与正式字体相当"""
+    import wordcloud
+
+    return os.path.join(os.path.dirname(wordcloud.__file__), 'DroidSansMono.ttf')
+
+
+def failed(name, response):
+    """错误响应：4xx/5xx，以及词云路由的失败占位图（200 但不带 ETag）"""
+    if response.status_code >= 400:
+        return True
+    return name == 'generate_wordcloud' and response.status_code == 200 and 'ETag' not in response.headers
+
+
+def prepare_assets(directory, font):
+    """
+    在 directory 下准备静态目录（fonts/simhei.ttf）与停用词表
+    :return: (静态目录, 停用词表路径)
+    """
+    static_dir = os.path.join(directory, 'static')
+    os.makedirs(os.path.join(static_dir, 'fonts'), exist_ok=True)
+    shutil.copyfile(font, os.path.join(static_dir, 'fonts', 'simhei.ttf'))
+    stopwords_path = os.path.join(directory, 'stopwords.txt')
+    with open(stopwords_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(BENCH_STOPWORDS) + '\n')
+    return static_dir, stopwords_path
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies, wall, errors, hits, cached):
+    """
+    :param hits: X-Cache: HIT 的响应数
+    :param cached: 带 X-Cache 头的响应数（未经 cached_response 的路由为 0）
+    """
+    latencies = sorted(latencies)
+    ms = lambda value: round(value * 1000, 3) if value is not None else None
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'cache_hits': hits,
+        'hit_ratio': round(hits / cached, 3) if cached else None,
+        'throughput_rps': round(len(latencies) / wall, 2) if wall else None,
+        'mean_ms': ms(sum(latencies) / len(latencies)) if latencies else None,
+        'p50_ms': ms(percentile(latencies, 50)),
+        'p90_ms': ms(percentile(latencies, 90)),
+        'p99_ms': ms(percentile(latencies, 99)),
+        'max_ms': ms(latencies[-1]) if latencies else None,
+    }
+
+
+def bench_route(flask_app, name, make_path, samples, concurrency, total, seed):
+    """以 concurrency 个线程共发出 total 个请求"""
+    rng = random.Random(seed)
+    paths = [make_path(rng, samples) for _ in range(total)]
+    per_worker = [paths[i::concurrency] for i in range(concurrency)]
+
+    def worker(worker_paths):
+        client = flask_app.test_client()
+        latencies, errors, hits, cached = [], 0, 0, 0
+        for path in worker_paths:
+            started = time.perf_counter()
+            response = client.get(path)
+            latencies.append(time.perf_counter() - started)
+            if failed(name, response):
+                errors += 1
+            status = response.headers.get('X-Cache')
+            if status is not None:
+                cached += 1
+                hits += status == 'HIT'
+        return latencies, errors, hits, cached
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(worker, per_worker))
+    wall = time.perf_counter() - started
+    return summarize([x for result in results for x in result[0]], wall,
+                     *(sum(result[i] for result in results) for i in (1, 2, 3)))
+
+
+def reset_caches(web):
+    """清空响应级缓存，使每个并发度都从冷缓存开始，测到的是路由本身而非 LRU 查找"""
+    web.response_cache.clear()
+    web.timeline_cache.clear()
+
+
+def disable_caches(web):
+    """容量为 0 的响应缓存写入即淘汰，TTL 为 0 的时间线缓存总是过期"""
+    web.response_cache.max_entries = 0
+    web.timeline_cache.ttl = 0
+
+
+def run_size(size, concurrency_levels, total, latency, routes, seed, font, uncached=False):
+    """在当前进程中构建语料并测量；须在导入 app 之前设置好 CACHE_DIR"""
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, HERE)
+    from corpus import generate_corpus
+    from fake_graph import FakeGraph
+    import app as web
+
+    static_dir, stopwords_path = prepare_assets(os.environ['CACHE_DIR'], font)
+    web.tokenizer.stopwords_path = stopwords_path
+
+    corpus = generate_corpus(size, seed=seed)
+    fake = FakeGraph(corpus, latency=latency)
+    web.graph.attach(fake)
+    flask_app = web.create_app(warm=False)
+    flask_app.static_folder = static_dir
+    if uncached:
+        disable_caches(web)
+
+    rng = random.Random(seed)
+    titles = [p['title'] for p in corpus['poems']]
+    samples = {
+        'poets': [p['name'] for p in corpus['poets']],
+        'keywords': sorted({t[:rng.choice((1, 2))] for t in rng.sample(titles, min(200, len(titles)))}),
+    }
+
+    results = {}
+    for name in routes:
+        make_path = ROUTES[name]
+        # 首个请求单独计时：包含快照导出、索引构建等冷启动开销
+        reset_caches(web)
+        started = time.perf_counter()
+        response = flask_app.test_client().get(make_path(random.Random(seed), samples))
+        cold_ms = round((time.perf_counter() - started) * 1000, 3)
+        levels = {}
+        for c in concurrency_levels:
+            reset_caches(web)
+            levels[str(c)] = bench_route(flask_app, name, make_path, samples, c, total, seed)
+        results[name] = {
+            'cold_ms': cold_ms,
+            'cold_status': response.status_code,
+            'cold_failed': failed(name, response),
+            'concurrency': levels,
+        }
+    return {
+        'poets': len(corpus['poets']),
+        'poems': len(corpus['poems']),
+        'friend_edges': len(corpus['friends']),
+        'graph_calls': dict(sorted(fake.calls.items())),
+        'routes': results,
+    }
+
+
+def spawn(size, args):
+    """每个规模一个干净的子进程，互不共享缓存与快照"""
+    with tempfile.TemporaryDirectory(prefix='bench-cache-') as cache_dir:
+        env = dict(os.environ, CACHE_DIR=cache_dir)
+        cmd = [sys.executable, os.path.abspath(__file__), '--worker',
+               '--sizes', str(size),
+               '--concurrency', ','.join(map(str, args.concurrency)),
+               '--requests', str(args.requests),
+               '--latency-ms', str(args.latency_ms),
+               '--routes', ','.join(args.routes),
+               '--seed', str(args.seed),
+               '--font', args.font] + (['--uncached'] if args.uncached else [])
+        proc = subprocess.run(cmd, cwd=ROOT, env=env, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f"规模 {size} 基准失败：\n{proc.stderr}")
+        return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def int_list(value):
+    return [int(v) for v in value.split(',') if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="路由吞吐量与延迟基准")
+    parser.add_argument('--sizes', type=int_list, default=[200, 2000], help="诗人数量，逗号分隔")
+    parser.add_argument('--concurrency', type=int_list, default=[1, 8], help="并发线程数，逗号分隔")
+    parser.add_argument('--requests', type=int, default=200, help="每个路由、每个并发度的请求数")
+    parser.add_argument('--latency-ms', type=float, default=1.0, help="模拟的每次查询往返延迟")
+    parser.add_argument('--routes', type=lambda v: v.split(','), default=list(ROUTES),
+                        help=f"可选：{','.join(ROUTES)}")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--font', help="词云字体文件，缺省为 wordcloud 包自带字体")
+    parser.add_argument('--uncached', action='store_true', help="关闭响应缓存与时间线缓存")
+    parser.add_argument('--output', help="JSON 报告路径，缺省时输出到标准输出")
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    unknown = [r for r in args.routes if r not in ROUTES]
+    if unknown:
+        parser.error(f"未知路由：{', '.join(unknown)}")
+
+    args.font = os.path.abspath(args.font) if args.font else default_font()
+    if not os.path.isfile(args.font):
+        parser.error(f"字体文件不存在：{args.font}")
+
+    if args.worker:
+        result = run_size(args.sizes[0], args.concurrency, args.requests,
+                          args.latency_ms / 1000, args.routes, args.seed, args.font, args.uncached)
+        print(json.dumps(result, ensure_ascii=False, sort_keys=True))
+        return
+
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'requests': args.requests,
+            'latency_ms': args.latency_ms,
+            'seed': args.seed,
+            'font': os.path.basename(args.font),
+            'uncached': args.uncached,
+        },
+        'sizes': {str(size): spawn(size, args) for size in args.sizes},
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+import os
+import threading
+
+from data_processing.neo4j_import import clean_author_name
+from metrics import STEP_SECONDS
+
+# 默认简介数据文件（与 app.py 中原有路径保持一致）
+DEFAULT_INTRO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'introduction.xlsx')
+
+
+class BioStore:
+    """
+    诗人简介内存索引
+    首次使用时解析 introduction.xlsx，之后按文件 mtime 变化自动重载
+    """
+
+    def __init__(self, file_path=DEFAULT_INTRO_PATH):
+        self.file_path = file_path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._bios = {}
+
+    def _load(self):
+        import pandas as pd
+
+        with STEP_SECONDS.time(step='bio_excel_load'):
+            df = pd.read_excel(self.file_path)
+        bios = {}
+        for author, produce in zip(df['author'], df['produce']):
+            if not isinstance(author, str):
+                continue
+            key = clean_author_name(author)
+            # 同名多行时以第一条为准（与原先 values[0] 的行为一致）
+            if key and key not in bios and isinstance(produce, str):
+                bios[key] = produce
+        return bios
+
+    def _ensure_fresh(self):
+        if not os.path.exists(self.file_path):
+            raise FileNotFoundError(f"数据文件不存在：{self.file_path}")
+
+        mtime = os.path.getmtime(self.file_path)
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            # 双重检查，避免并发请求重复解析
+            if mtime != self._mtime:
+                self._bios = self._load()
+                self._mtime = mtime
+
+    def get(self, name, default=None):
+        """按清洗后的诗人姓名查询简介"""
+        self._ensure_fresh()
+        return self._bios.get(clean_author_name(name), default)
+
+
+bio_store = BioStore()
@@ -0,0 +1,158 @@
+import os
+
+import numpy as np
+
+from atomic_io import NpzSnapshot
+from render_cache import CACHE_DIR
+
+GEO_VISITS_PATH = os.path.join(CACHE_DIR, 'geo_visits.npz')
+
+# 按 (诗人, 地点) 聚合的到访次数
+EXPORT_QUERY = """
+MATCH (p:Poet)-[v:VISITED]->(pl:Place)
+WHERE pl.name IS NOT NULL AND pl.lat IS NOT NULL AND pl.lon IS NOT NULL
+RETURN p.name as poet, pl.name as place, pl.lat as lat, pl.lon as lon, count(v) as visits
+"""
+
+MAX_ZOOM = 12
+# 缩放级别 0 时的网格边长（度），每放大一级减半
+BASE_CELL_DEGREES = 40.0
+
+
+def cell_degrees(zoom):
+    return BASE_CELL_DEGREES / (2 ** zoom)
+
+
+def export_visits(graph):
+    """从图数据库导出到访计数，返回列式数组字典"""
+    rows = graph.run(EXPORT_QUERY).data()
+    poets = sorted({r['poet'] for r in rows})
+    places = {}
+    for r in rows:
+        places.setdefault(r['place'], (float(r['lat']), float(r['lon'])))
+    place_names = sorted(places)
+    poet_ids = {name: i for i, name in enumerate(poets)}
+    place_ids = {name: i for i, name in enumerate(place_names)}
+
+    poet_col = np.array([poet_ids[r['poet']] for r in rows], dtype=np.int32)
+    place_col = np.array([place_ids[r['place']] for r in rows], dtype=np.int32)
+    visits_col = np.array([r['visits'] for r in rows], dtype=np.int64)
+
+    # 按诗人排序，便于以偏移量切片
+    order = np.argsort(poet_col, kind='stable')
+    return {
+        'poets': np.array(poets, dtype=str),
+        'places': np.array(place_names, dtype=str),
+        'lat': np.array([places[name][0] for name in place_names], dtype=np.float64),
+        'lon': np.array([places[name][1] for name in place_names], dtype=np.float64),
+        'poet': poet_col[order],
+        'place': place_col[order],
+        'visits': visits_col[order],
+    }
+
+
+def grid_clusters(lat, lon, weight, cell):
+    """
+    将带权地点按 cell 度的经纬网格聚合
+    :return: {'lat', 'lon'（加权质心）, 'count'（权重和）, 'places'（地点数）, 'top'（权重最大的地点下标）}
+    """
+    cx = np.floor((lon + 180.0) / cell).astype(np.int64)
+    cy = np.floor((lat + 90.0) / cell).astype(np.int64)
+    keys = cy * (int(360.0 / cell) + 1) + cx
+    _, inverse = np.unique(keys, return_inverse=True)
+    count = np.bincount(inverse, weights=weight)
+    # 每个格子内按权重降序，取第一条作为代表地点
+    order = np.lexsort((-weight, inverse))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = inverse[order][1:] != inverse[order][:-1]
+    return {
+        'lat': np.bincount(inverse, weights=lat * weight) / count,
+        'lon': np.bincount(inverse, weights=lon * weight) / count,
+        'count': count.astype(np.int64),
+        'places': np.bincount(inverse),
+        'top': order[first],
+    }
+
+
+class GeoClusterStore:
+    """
+    诗人足迹的多级网格聚合
+    全体诗人的各缩放级别在加载时一次算好；单个诗人的聚合按需计算（数据量很小）
+    文件由 precompute.py geo 生成；文件缺失时首次使用自动导出一次，mtime 变化时重载
+    """
+
+    def __init__(self, graph, path=GEO_VISITS_PATH):
+        self.graph = graph
+        self.path = path
+        self._table = NpzSnapshot(path, lambda: export_visits(graph), self._index)
+
+    @classmethod
+    def _index(cls, arrays):
+        """(arrays, poet_ids, offsets, levels)，全体诗人的各级聚合在此算好"""
+        poets = arrays['poets'].tolist()
+        poet_ids = {name: i for i, name in enumerate(poets)}
+        offsets = np.searchsorted(arrays['poet'], np.arange(len(poets) + 1), side='left')
+        weights = np.bincount(arrays['place'], weights=arrays['visits'], minlength=len(arrays['places']))
+        levels = [cls._cluster(arrays, weights, zoom) for zoom in range(MAX_ZOOM + 1)]
+        return arrays, poet_ids, offsets, levels
+
+    def rebuild(self):
+        """重新导出并落盘，返回 (地点数, 计数行数)"""
+        arrays = export_visits(self.graph)
+        self._table.save(arrays)
+        return len(arrays['places']), len(arrays['visits'])
+
+    @staticmethod
+    def _cluster(arrays, weights, zoom):
+        visited = np.flatnonzero(weights)
+        clusters = grid_clusters(arrays['lat'][visited], arrays['lon'][visited],
+                                 weights[visited].astype(np.float64), cell_degrees(zoom))
+        clusters['top'] = visited[clusters['top']]
+        return clusters
+
+    def clusters(self, zoom, bbox=None, poet=None):
+        """
+        :param zoom: 缩放级别 0..MAX_ZOOM
+        :param bbox: (min_lon, min_lat, max_lon, max_lat)，按聚合质心筛选
+        :param poet: 仅统计该诗人的足迹
+        :return: [{'lat', 'lon', 'count', 'places', 'name'}]，按 count 降序
+        """
+        arrays, poet_ids, offsets, levels = self._table.get()
+        if poet is None:
+            clusters = levels[zoom]
+        else:
+            poet_id = poet_ids.get(poet)
+            if poet_id is None:
+                return []
+            rows = slice(offsets[poet_id], offsets[poet_id + 1])
+            weights = np.bincount(arrays['place'][rows], weights=arrays['visits'][rows],
+                                  minlength=len(arrays['places']))
+            clusters = self._cluster(arrays, weights, zoom)
+
+        mask = np.ones(len(clusters['count']), dtype=bool)
+        if bbox is not None:
+            min_lon, min_lat, max_lon, max_lat = bbox
+            mask = ((clusters['lon'] >= min_lon) & (clusters['lon'] <= max_lon) &
+                    (clusters['lat'] >= min_lat) & (clusters['lat'] <= max_lat))
+        selected = np.flatnonzero(mask)
+        selected = selected[np.argsort(-clusters['count'][selected], kind='stable')]
+
+        names = arrays['places']
+        return [{
+            'lat': round(float(clusters['lat'][i]), 5),
+            'lon': round(float(clusters['lon'][i]), 5),
+            'count': int(clusters['count'][i]),
+            'places': int(clusters['places'][i]),
+            'name': str(names[clusters['top'][i]]),
+        } for i in selected]
+
+
+def parse_bbox(raw):
+    """解析 'min_lon,min_lat,max_lon,max_lat'"""
+    parts = [float(part) for part in raw.split(',')]
+    if len(parts) != 4:
+        raise ValueError('bbox 格式应为 min_lon,min_lat,max_lon,max_lat')
+    min_lon, min_lat, max_lon, max_lat = parts
+    if min_lon > max_lon or min_lat > max_lat:
+        raise ValueError('bbox 的最小值不能大于最大值')
+    return min_lon, min_lat, max_lon, max_lat
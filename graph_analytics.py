@@ -0,0 +1,194 @@
+import os
+
+import numpy as np
+
+from atomic_io import NpzSnapshot
+from render_cache import CACHE_DIR
+
+ANALYTICS_PATH = os.path.join(CACHE_DIR, 'graph_analytics.npz')
+
+POETS_QUERY = """
+MATCH (p:Poet)
+WHERE p.name IS NOT NULL
+RETURN p.name as name, p.num_poems as count
+"""
+
+# 无向边只导出一次
+FRIENDS_QUERY = """
+MATCH (a:Poet)-[:FRIEND_OF]-(b:Poet)
+WHERE a.name < b.name
+RETURN DISTINCT a.name as source, b.name as target
+"""
+
+
+def build_csr(n, sources, targets):
+    """无向边 -> 对称 CSR 邻接 (indptr, indices)"""
+    src = np.concatenate([sources, targets])
+    dst = np.concatenate([targets, sources])
+    order = np.lexsort((dst, src))
+    src, dst = src[order], dst[order]
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    return indptr, dst.astype(np.int32)
+
+
+def pagerank(indptr, indices, damping=0.85, tol=1e-9, max_iter=100):
+    n = len(indptr) - 1
+    degree = np.diff(indptr)
+    sources = np.repeat(np.arange(n), degree)
+    rank = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        contrib = np.where(degree > 0, rank / np.maximum(degree, 1), 0.0)
+        dangling = rank[degree == 0].sum()
+        new_rank = (1 - damping) / n + damping * (
+            np.bincount(indices, weights=contrib[sources], minlength=n) + dangling / n)
+        if np.abs(new_rank - rank).sum() < tol:
+            return new_rank
+        rank = new_rank
+    return rank
+
+
+def approximate_betweenness(indptr, indices, samples=64, seed=0):
+    """
+    Brandes 算法的抽样近似：从 samples 个随机源点做 BFS，再按 n / samples 放大
+    """
+    n = len(indptr) - 1
+    if n == 0:
+        return np.zeros(0)
+    rng = np.random.default_rng(seed)
+    pivots = rng.choice(n, size=min(samples, n), replace=False)
+    centrality = np.zeros(n)
+
+    for s in pivots:
+        sigma = np.zeros(n)
+        sigma[s] = 1
+        dist = np.full(n, -1)
+        dist[s] = 0
+        order = []
+        frontier = np.array([s])
+        # 逐层 BFS，每层整体向量化
+        while len(frontier):
+            order.append(frontier)
+            starts, ends = indptr[frontier], indptr[frontier + 1]
+            parents = np.repeat(frontier, ends - starts)
+            children = indices[np.concatenate([np.arange(a, b) for a, b in zip(starts, ends)])] \
+                if len(parents) else np.empty(0, dtype=np.int32)
+            fresh = dist[children] == -1
+            new_nodes = np.unique(children[fresh])
+            dist[new_nodes] = dist[frontier[0]] + 1
+            on_path = dist[children] == dist[frontier[0]] + 1
+            np.add.at(sigma, children[on_path], sigma[parents[on_path]])
+            frontier = new_nodes
+
+        delta = np.zeros(n)
+        for level in reversed(order[:-1]):
+            starts, ends = indptr[level], indptr[level + 1]
+            parents = np.repeat(level, ends - starts)
+            children = indices[np.concatenate([np.arange(a, b) for a, b in zip(starts, ends)])]
+            down = dist[children] == dist[parents] + 1
+            p, c = parents[down], children[down]
+            np.add.at(delta, p, sigma[p] / sigma[c] * (1 + delta[c]))
+        delta[s] = 0
+        centrality += delta
+
+    # 无向图每条最短路径被两端各计一次
+    return centrality * (n / len(pivots)) / 2
+
+
+def label_propagation(indptr, indices, max_iter=30):
+    """同步标签传播社区发现：每轮取邻居中出现最多的标签（并列取最小）"""
+    n = len(indptr) - 1
+    labels = np.arange(n)
+    degree = np.diff(indptr)
+    nodes = np.repeat(np.arange(n), degree)
+    has_neighbors = degree > 0
+    for _ in range(max_iter):
+        keys, counts = np.unique(nodes * n + labels[indices], return_counts=True)
+        key_nodes, key_labels = keys // n, keys % n
+        # 每个节点内按 (次数降序, 标签升序) 排，取第一条
+        order = np.lexsort((key_labels, -counts, key_nodes))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = key_nodes[order][1:] != key_nodes[order][:-1]
+        best = order[first]
+        new_labels = labels.copy()
+        new_labels[key_nodes[best]] = key_labels[best]
+        new_labels[~has_neighbors] = labels[~has_neighbors]
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+
+    # 重新编号为 0..k-1
+    _, labels = np.unique(labels, return_inverse=True)
+    return labels
+
+
+def compute_snapshot(graph, betweenness_samples=64):
+    """导出 FRIEND_OF 邻接并计算各项指标"""
+    poets = graph.run(POETS_QUERY).data()
+    names = [row['name'] for row in poets]
+    ids = {name: i for i, name in enumerate(names)}
+    edges = [(ids[r['source']], ids[r['target']]) for r in graph.run(FRIENDS_QUERY).data()
+             if r['source'] in ids and r['target'] in ids]
+    sources = np.array([s for s, _ in edges], dtype=np.int64)
+    targets = np.array([t for _, t in edges], dtype=np.int64)
+
+    indptr, indices = build_csr(len(names), sources, targets)
+    return {
+        'names': np.array(names, dtype=str),
+        'num_poems': np.array([row['count'] or 0 for row in poets], dtype=np.int64),
+        'indptr': indptr,
+        'indices': indices,
+        'degree': np.diff(indptr),
+        'pagerank': pagerank(indptr, indices),
+        'betweenness': approximate_betweenness(indptr, indices, samples=betweenness_samples),
+        'community': label_propagation(indptr, indices),
+    }
+
+
+class AnalyticsSnapshot:
+    """
+    FRIEND_OF 网络的中心性与社区指标快照
+    由 precompute.py analytics 生成；文件缺失时首次使用自动计算一次，mtime 变化时重载
+    """
+
+    def __init__(self, graph, path=ANALYTICS_PATH):
+        self.graph = graph
+        self.path = path
+        self._table = NpzSnapshot(path, lambda: compute_snapshot(graph), self._index)
+
+    @staticmethod
+    def _index(arrays):
+        """(arrays, ids, ranking, ranked)"""
+        ids = {name: i for i, name in enumerate(arrays['names'].tolist())}
+        # PageRank 降序，并列按姓名
+        ranking = np.lexsort((arrays['names'], -arrays['pagerank']))
+        ranked = [{'name': str(arrays['names'][i]),
+                   'count': int(arrays['num_poems'][i]),
+                   'pagerank': float(arrays['pagerank'][i])} for i in ranking]
+        return arrays, ids, ranking, ranked
+
+    def rebuild(self, betweenness_samples=64):
+        arrays = compute_snapshot(self.graph, betweenness_samples)
+        self._table.save(arrays)
+        return len(arrays['names']), int(arrays['indptr'][-1] // 2)
+
+    def ranked_poets(self):
+        """按中心性排序的诗人列表"""
+        return self._table.get()[3]
+
+    def metrics(self, name):
+        """单个诗人的各项指标，不存在时返回 None"""
+        arrays, ids, ranking, _ = self._table.get()
+        i = ids.get(name)
+        if i is None:
+            return None
+        community = arrays['community']
+        return {
+            'name': name,
+            'degree': int(arrays['degree'][i]),
+            'pagerank': float(arrays['pagerank'][i]),
+            'pagerank_rank': int(np.flatnonzero(ranking == i)[0]) + 1,
+            'betweenness': float(arrays['betweenness'][i]),
+            'community': int(community[i]),
+            'community_size': int(np.count_nonzero(community == community[i])),
+        }
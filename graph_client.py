@@ -0,0 +1,165 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from metrics import GRAPH_QUERY_SECONDS, profiler, query_id
+
+log = logging.getLogger(__name__)
+
+
+def retryable_errors():
+    """可重试的瞬时错误（py2neo 延迟导入）"""
+    from py2neo.errors import ConnectionBroken, ConnectionUnavailable, ServiceUnavailable, TransientError
+    return TransientError, ConnectionUnavailable, ConnectionBroken, ServiceUnavailable
+
+
+class GraphBusy(Exception):
+    """连接池已满且在等待时间内未能获得连接"""
+
+
+class GraphTimeout(Exception):
+    """查询超过单次执行时限"""
+
+
+class QueryResult:
+    """已物化的查询结果，接口与 py2neo Cursor 的常用部分一致"""
+
+    def __init__(self, rows):
+        self._rows = rows
+
+    def data(self):
+        return self._rows
+
+    def evaluate(self):
+        if not self._rows:
+            return None
+        return next(iter(self._rows[0].values()), None)
+
+    def __iter__(self):
+        return iter(self._rows)
+
+
+class GraphClient:
+    """
+    带连接池上限、获取超时、查询超时与瞬时错误重试的图数据库客户端
+    首次查询时才导入 py2neo 并建立连接
+    """
+
+    def __init__(self, uri, user, password, pool_size=20, acquire_timeout=5.0,
+                 query_timeout=30.0, max_retries=2, retry_backoff=0.2):
+        self.uri = uri
+        self.pool_size = pool_size
+        self.acquire_timeout = acquire_timeout
+        self.query_timeout = query_timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._auth = (user, password)
+        self._graph = None
+        self._graph_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._in_use = 0
+        self._counter_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='neo4j')
+
+    @property
+    def graph(self):
+        if self._graph is None:
+            with self._graph_lock:
+                if self._graph is None:
+                    if not self._auth[1]:
+                        raise RuntimeError("未配置 NEO4J_PASSWORD，请在 .env 中设置！")
+                    from py2neo import Graph
+                    self._graph = Graph(self.uri, auth=self._auth, max_size=self.pool_size)
+        return self._graph
+
+    def attach(self, graph):
+        """改用已建立的 Graph（或接口兼容的替身，如基准测试的内存图）"""
+        with self._graph_lock:
+            self._graph = graph
+
+    def _execute(self, query, parameters):
+        try:
+            retryable = retryable_errors()
+            for attempt in range(self.max_retries + 1):
+                try:
+                    return self.graph.run(query, parameters).data()
+                except retryable as e:
+                    if attempt == self.max_retries:
+                        raise
+                    log.warning(f"Neo4j 瞬时错误，第 {attempt + 1} 次重试：{e}")
+                    time.sleep(self.retry_backoff * (2 ** attempt))
+        finally:
+            # 连接在查询真正结束后才归还，超时返回的调用不会提前释放名额
+            with self._counter_lock:
+                self._in_use -= 1
+            self._slots.release()
+
+    def run(self, query, parameters=None, **kwparameters):
+        """执行 Cypher 并返回 QueryResult，耗时按查询记入指标"""
+        parameters = dict(parameters or {}, **kwparameters)
+        started = time.perf_counter()
+        try:
+            rows = self._run(query, parameters)
+        finally:
+            elapsed = time.perf_counter() - started
+            GRAPH_QUERY_SECONDS.observe(elapsed, query=query_id(query))
+        profiler.observe(self, query, parameters, elapsed)
+        return QueryResult(rows)
+
+    def _run(self, query, parameters):
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise GraphBusy(f"等待数据库连接超时（{self.acquire_timeout}s）")
+        with self._counter_lock:
+            self._in_use += 1
+
+        future = self._executor.submit(self._execute, query, parameters)
+        try:
+            # query_timeout 为 None 时不设时限（离线批处理）
+            return future.result(timeout=self.query_timeout)
+        except FutureTimeout:
+            raise GraphTimeout(f"查询超时（{self.query_timeout}s）")
+
+    def health(self):
+        """连通性检查与连接池使用情况"""
+        status = {
+            'uri': self.uri,
+            'pool_size': self.pool_size,
+            'in_use': self._in_use,
+            'utilisation': round(self._in_use / self.pool_size, 3),
+        }
+        try:
+            started = time.perf_counter()
+            self.run("RETURN 1").evaluate()
+            status['latency_ms'] = round((time.perf_counter() - started) * 1000, 2)
+            status['ok'] = True
+        except Exception as e:
+            status['ok'] = False
+            status['error'] = str(e)
+            return status
+        # 驱动内部统计依赖 py2neo 私有结构（替身图也没有），取不到时只是缺省该项，不影响健康状态
+        try:
+            status['driver_in_use'] = sum(self.graph.service.connector.in_use.values())
+        except Exception:
+            status['driver_in_use'] = None
+        return status
+
+
+def create_graph_client(**overrides):
+    """
+    按环境变量创建图数据库客户端（不立即连接）
+    :param overrides: 覆盖 GraphClient 的构造参数，如离线任务的 query_timeout=None、max_retries=0
+    """
+    options = dict(
+        uri=os.getenv('NEO4J_URI', 'bolt://localhost:7687'),
+        user=os.getenv('NEO4J_USER', 'neo4j'),
+        password=os.getenv('NEO4J_PASSWORD'),
+        pool_size=int(os.getenv('NEO4J_POOL_SIZE', '20')),
+        acquire_timeout=float(os.getenv('NEO4J_ACQUIRE_TIMEOUT', '5')),
+        query_timeout=float(os.getenv('NEO4J_QUERY_TIMEOUT', '30')),
+        max_retries=int(os.getenv('NEO4J_MAX_RETRIES', '2')),
+        retry_backoff=float(os.getenv('NEO4J_RETRY_BACKOFF', '0.2')),
+    )
+    options.update(overrides)
+    return GraphClient(**options)
@@ -0,0 +1,49 @@
+# 诗人足迹热力：预计算的 (:Poet)-[:HEAT {intensity}]->(:Place) 投影
+
+# 预计算投影（由 precompute.py heat 刷新）
+HEAT_QUERY = """
+MATCH (:Poet {name: $name})-[h:HEAT]->(place:Place)
+RETURN place.lat as lat, place.lon as lon, h.intensity as intensity
+"""
+
+# 投影尚未构建时的实时聚合：只展开该诗人自己的 VISITED 边
+LIVE_QUERY = """
+MATCH (:Poet {name: $name})-[v:VISITED]->(place:Place)
+WHERE place.lat IS NOT NULL AND place.lon IS NOT NULL
+RETURN place.lat as lat, place.lon as lon, count(v) as intensity
+"""
+
+INDEX_QUERIES = [
+    "CREATE INDEX poet_name IF NOT EXISTS FOR (p:Poet) ON (p.name)",
+    "CREATE INDEX place_name IF NOT EXISTS FOR (pl:Place) ON (pl.name)",
+]
+
+CLEAR_QUERY = """
+MATCH (:Poet)-[h:HEAT]->(:Place)
+DELETE h
+"""
+
+BUILD_QUERY = """
+MATCH (p:Poet)-[v:VISITED]->(place:Place)
+WHERE place.lat IS NOT NULL AND place.lon IS NOT NULL
+WITH p, place, count(v) AS visits
+MERGE (p)-[h:HEAT]->(place)
+SET h.intensity = visits
+RETURN count(h) as edges
+"""
+
+
+def heatmap_rows(graph, name):
+    """优先读取预计算投影，缺失时回退到实时聚合"""
+    rows = graph.run(HEAT_QUERY, {'name': name}).data()
+    if not rows:
+        rows = graph.run(LIVE_QUERY, {'name': name}).data()
+    return rows
+
+
+def refresh_heat(graph):
+    """重建 HEAT 投影，返回写入的边数"""
+    for query in INDEX_QUERIES:
+        graph.run(query)
+    graph.run(CLEAR_QUERY)
+    return graph.run(BUILD_QUERY).evaluate()
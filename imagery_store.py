@@ -0,0 +1,132 @@
+import os
+import threading
+
+import numpy as np
+
+from atomic_io import NpzSnapshot
+from render_cache import CACHE_DIR
+
+IMAGERY_COUNTS_PATH = os.path.join(CACHE_DIR, 'imagery_counts.npz')
+
+# 诗作缺少年份时的占位值，任何年份区间筛选都会排除它
+UNKNOWN_YEAR = np.iinfo(np.int32).min
+
+# 按 (诗人, 年份, 意象) 聚合的使用次数
+EXPORT_QUERY = """
+MATCH (p:Poet)-[:WROTE]->(poem)-[:CONTAINS_IMAGE]->(img)
+WHERE img.name IS NOT NULL
+RETURN p.name as poet, poem.year as year, img.name as image, count(*) as freq
+"""
+
+# 全库意象使用次数：统计每条 CONTAINS_IMAGE 边（含无作者的诗作，合著诗作只计一次），单独成表
+GLOBAL_EXPORT_QUERY = """
+MATCH ()-[:CONTAINS_IMAGE]->(i:Image)
+WHERE i.name IS NOT NULL
+RETURN i.name as image, count(*) as freq
+"""
+
+
+def export_counts(graph):
+    """从图数据库导出意象计数，返回列式数组字典"""
+    rows = graph.run(EXPORT_QUERY).data()
+    poets = sorted({r['poet'] for r in rows})
+    images = sorted({r['image'].strip() for r in rows})
+    poet_ids = {name: i for i, name in enumerate(poets)}
+    image_ids = {name: i for i, name in enumerate(images)}
+
+    poet_col = np.array([poet_ids[r['poet']] for r in rows], dtype=np.int32)
+    year_col = np.array([r['year'] if isinstance(r['year'], int) else UNKNOWN_YEAR for r in rows], dtype=np.int32)
+    image_col = np.array([image_ids[r['image'].strip()] for r in rows], dtype=np.int32)
+    freq_col = np.array([r['freq'] for r in rows], dtype=np.int64)
+
+    # 按诗人排序，便于以偏移量切片
+    order = np.argsort(poet_col, kind='stable')
+
+    # 全库表：名称去空白后合并，按次数降序（并列按名称）
+    global_counts = {}
+    for r in graph.run(GLOBAL_EXPORT_QUERY).data():
+        if isinstance(r['image'], str):
+            name = r['image'].strip()
+            global_counts[name] = global_counts.get(name, 0) + r['freq']
+    ranked = sorted(global_counts.items(), key=lambda item: (-item[1], item[0]))
+    return {
+        'poets': np.array(poets, dtype=str),
+        'images': np.array(images, dtype=str),
+        'poet': poet_col[order],
+        'year': year_col[order],
+        'image': image_col[order],
+        'freq': freq_col[order],
+        'global_images': np.array([name for name, _ in ranked], dtype=str),
+        'global_freq': np.array([n for _, n in ranked], dtype=np.int64),
+    }
+
+
+class ImageryStore:
+    """
+    诗人 × 年份 × 意象 的物化计数表，附带按 CONTAINS_IMAGE 边统计的全库排行表
+    常驻内存的紧凑数组，任意年份区间的排行由 bincount 求和得到，不再遍历图
+    文件由 precompute.py imagery 生成；文件缺失时首次使用自动导出一次，mtime 变化时重载
+    """
+
+    def __init__(self, graph, path=IMAGERY_COUNTS_PATH):
+        self.graph = graph
+        self.path = path
+        self._table = NpzSnapshot(path, lambda: export_counts(graph), self._index)
+        self._upgrade_lock = threading.Lock()
+
+    @staticmethod
+    def _index(arrays):
+        """(arrays, poet_ids, offsets)"""
+        poets = arrays['poets'].tolist()
+        poet_ids = {name: i for i, name in enumerate(poets)}
+        # 每位诗人的行区间 [offsets[i], offsets[i + 1])
+        offsets = np.searchsorted(arrays['poet'], np.arange(len(poets) + 1), side='left')
+        return arrays, poet_ids, offsets
+
+    def rebuild(self):
+        """重新导出并落盘，返回计数行数"""
+        arrays = export_counts(self.graph)
+        self._table.save(arrays)
+        return len(arrays['freq'])
+
+    def global_ranking(self, limit=100):
+        """
+        全库意象排行（全库表已按次数降序），随计数表重载更新
+        :return: [(意象, 次数)]，按次数降序
+        """
+        arrays = self._table.get()[0]
+        if 'global_freq' not in arrays:
+            # 旧版计数表没有全库表：重新导出一次
+            with self._upgrade_lock:
+                if 'global_freq' not in self._table.get()[0]:
+                    self.rebuild()
+            arrays = self._table.get()[0]
+        names, freqs = arrays['global_images'][:limit], arrays['global_freq'][:limit]
+        return [(str(name), int(n)) for name, n in zip(names, freqs)]
+
+    def top_images(self, poet, limit, start=None, end=None):
+        """
+        诗人意象排行
+        :param start: 起始年份（含），None 表示不限
+        :param end: 结束年份（不含），None 表示不限
+        :return: [(意象, 次数)]，按次数降序
+        """
+        arrays, poet_ids, offsets = self._table.get()
+        poet_id = poet_ids.get(poet)
+        if poet_id is None:
+            return []
+
+        rows = slice(offsets[poet_id], offsets[poet_id + 1])
+        years, images, freqs = arrays['year'][rows], arrays['image'][rows], arrays['freq'][rows]
+        if start is not None or end is not None:
+            mask = years != UNKNOWN_YEAR
+            if start is not None:
+                mask &= years >= start
+            if end is not None:
+                mask &= years < end
+            images, freqs = images[mask], freqs[mask]
+
+        totals = np.bincount(images, weights=freqs, minlength=len(arrays['images']))
+        top = np.argsort(-totals, kind='stable')[:limit]
+        names = arrays['images']
+        return [(str(names[i]), int(totals[i])) for i in top if totals[i] > 0]
@@ -0,0 +1,270 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ink_store import ink_store
+from metrics import EXTERNAL_CALL_SECONDS, STEP_SECONDS
+
+log = logging.getLogger(__name__)
+
+# 生成后端：dashscope（阿里云万相）或 stub（本地离线占位图，便于测试）
+INK_BACKEND = os.getenv('INK_BACKEND', 'dashscope')
+# 后台生成线程数
+INK_WORKERS = int(os.getenv('INK_WORKERS', '2'))
+# 已结束任务的保留时间（秒）
+INK_JOB_TTL = int(os.getenv('INK_JOB_TTL', '600'))
+# 同时进行的上游生成调用上限，及排队等待的最长时间（秒）
+INK_MAX_UPSTREAM = int(os.getenv('INK_MAX_UPSTREAM', '2'))
+INK_UPSTREAM_WAIT = float(os.getenv('INK_UPSTREAM_WAIT', '60'))
+# 生成图片下载的大小上限（字节）与超时（秒）
+INK_MAX_DOWNLOAD_BYTES = int(os.getenv('INK_MAX_DOWNLOAD_BYTES', str(10 * 1024 * 1024)))
+INK_DOWNLOAD_TIMEOUT = float(os.getenv('INK_DOWNLOAD_TIMEOUT', '30'))
+
+# 匹配前端尺寸
+INK_SIZE = (780, 480)
+
+_http = None
+_http_lock = threading.Lock()
+
+
+def http_session():
+    """复用连接的下载会话（首次使用时创建）"""
+    global _http
+    if _http is None:
+        with _http_lock:
+            if _http is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=INK_MAX_UPSTREAM))
+                session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=INK_MAX_UPSTREAM))
+                _http = session
+    return _http
+
+
+def build_prompt(poem_content):
+    # 优化后的Prompt模板
+    return f"""
+        传统水墨风格插画，基于诗句：{poem_content}
+        元素要求：
+        - 使用水墨笔触技法，保留适当飞白效果
+        - 布局采用散点透视构图
+        - 色调为彩色+不要只有黑白
+        - 全部为景物，不要出现文字
+        - 用色建议：仅保留10%以下朱砂/花青点缀
+        - 构图参考：南宋马远“边角之景”布局
+        """
+
+
+def synthesize_dashscope(prompt):
+    """调用阿里云SDK生成插画并下载"""
+    from dashscope import ImageSynthesis
+
+    # 调用阿里云SDK（同步示例）
+    with EXTERNAL_CALL_SECONDS.time(target='dashscope'):
+        response = ImageSynthesis.call(
+            model="wanx2.1-t2i-turbo",
+            prompt=prompt,
+            parameters={
+                "size": f"{INK_SIZE[0]}*{INK_SIZE[1]}",
+                "n": 1,
+                "style": "traditional ink painting",
+                "composition_ratio": "3:2"  # 固定宽高比
+            }
+        )
+
+    if response.status_code != 200:
+        raise Exception(f"API错误：{response.message}")
+
+    # 获取生成结果
+    result = response.output.results[0]
+    return download_image(result.url)
+
+
+def download_image(url):
+    """
+    流式下载图片，超过 INK_MAX_DOWNLOAD_BYTES 即中止
+    小图留在内存，大图溢出到临时文件；返回尚未解码的 PIL 图像
+    """
+    from PIL import Image
+
+    with EXTERNAL_CALL_SECONDS.time(target='ink_download'), \
+            http_session().get(url, stream=True, timeout=INK_DOWNLOAD_TIMEOUT) as resp:
+        resp.raise_for_status()
+        declared = int(resp.headers.get('Content-Length') or 0)
+        if declared > INK_MAX_DOWNLOAD_BYTES:
+            raise Exception(f"图片过大：{declared} 字节")
+
+        spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+        received = 0
+        for chunk in resp.iter_content(chunk_size=64 * 1024):
+            received += len(chunk)
+            if received > INK_MAX_DOWNLOAD_BYTES:
+                spool.close()
+                raise Exception(f"图片超过大小上限：{INK_MAX_DOWNLOAD_BYTES} 字节")
+            spool.write(chunk)
+
+    spool.seek(0)
+    return Image.open(spool)
+
+
+def synthesize_stub(prompt):
+    """离线占位后端：由 prompt 哈希确定性地绘制远山层次"""
+    from PIL import Image, ImageDraw
+
+    seed = hashlib.md5(prompt.encode()).digest()
+    width, height = INK_SIZE
+    img = Image.new('RGB', INK_SIZE, color=(245, 242, 232))
+    draw = ImageDraw.Draw(img)
+    for layer in range(4):
+        base = height // 2 + layer * 40
+        peak = seed[layer] % (width // 2) + width // 4
+        shade = 200 - layer * 45
+        draw.polygon([(0, height), (0, base), (peak, base - 60 - seed[layer + 4] % 80),
+                      (width, base + 20), (width, height)],
+                     fill=(shade, shade, shade))
+    return img
+
+
+SYNTHESIZERS = {
+    'dashscope': synthesize_dashscope,
+    'stub': synthesize_stub,
+}
+
+
+def post_process(img):
+    """增加水墨质感"""
+    from PIL import ImageEnhance
+
+    # JPEG 解码时直接以灰度、按目标尺寸降采样读取，减少解码内存
+    img.draft("L", INK_SIZE)
+    img = img.convert("L")  # 转灰度
+    img = ImageEnhance.Contrast(img).enhance(1.2)  # 提高对比度
+    img = ImageEnhance.Sharpness(img).enhance(1.1)  # 锐化笔触
+    return img
+
+
+class SingleFlight:
+    """
+    相同 key 的并发调用只执行一次，其余调用等待并共享结果（或异常）
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = {'done': threading.Event(), 'result': None, 'error': None}
+                self._calls[key] = call
+
+        if not leader:
+            call['done'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['result']
+
+        try:
+            call['result'] = fn(*args)
+            return call['result']
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call['done'].set()
+
+
+_single_flight = SingleFlight()
+_upstream_slots = threading.BoundedSemaphore(INK_MAX_UPSTREAM)
+
+
+def _synthesize_limited(prompt):
+    """限制并发的上游调用，排队超时则视为服务繁忙"""
+    if not _upstream_slots.acquire(timeout=INK_UPSTREAM_WAIT):
+        raise Exception("上游生成服务排队超时")
+    try:
+        return SYNTHESIZERS[INK_BACKEND](prompt)
+    finally:
+        _upstream_slots.release()
+
+
+def _generate(poem_content, cache_key):
+    # 等待期间其他进程可能已生成完毕
+    stored = ink_store.lookup(cache_key)
+    if stored is not None:
+        return stored
+    img = _synthesize_limited(build_prompt(poem_content))
+    with STEP_SECONDS.time(step='ink_post_process'):
+        img = post_process(img)
+    # 各宽度的 WebP / JPEG 版本由图片存储统一编码、原子落盘
+    return ink_store.put(cache_key, img)
+
+
+def generate_background(poem_content, cache_key):
+    """
+    完整生成流程：合成 -> 后期处理 -> 写入图片存储；同一诗文并发请求只生成一次
+    :return: ink_store manifest
+    """
+    return _single_flight.do(cache_key, _generate, poem_content, cache_key)
+
+
+class InkJobQueue:
+    """
+    水墨背景异步任务队列
+    任务以 cache_key 作为 job id，同一诗文的并发提交合并为一次生成
+    """
+
+    def __init__(self, max_workers=INK_WORKERS, job_ttl=INK_JOB_TTL):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ink')
+        self._job_ttl = job_ttl
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+    def _expire(self):
+        now = time.time()
+        for job_id, job in list(self._jobs.items()):
+            if job['finished_at'] and now - job['finished_at'] > self._job_ttl:
+                del self._jobs[job_id]
+
+    def _run(self, job_id, fn, *args):
+        with self._lock:
+            self._jobs[job_id]['status'] = 'running'
+        try:
+            fn(*args)
+        except Exception as e:
+            log.error(f"水墨生成任务失败 | 任务：{job_id} | 错误：{str(e)}")
+            status, error = 'failed', str(e)
+        else:
+            status, error = 'done', None
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(status=status, error=error, finished_at=time.time())
+
+    def submit(self, job_id, fn, *args):
+        """提交任务；相同 job id 正在排队或执行时直接复用"""
+        with self._lock:
+            self._expire()
+            job = self._jobs.get(job_id)
+            if job is None or job['status'] in ('done', 'failed'):
+                job = {'id': job_id, 'status': 'queued', 'error': None, 'finished_at': None}
+                self._jobs[job_id] = job
+                self._executor.submit(self._run, job_id, fn, *args)
+            return dict(job)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+
+ink_jobs = InkJobQueue()
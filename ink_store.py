@@ -0,0 +1,222 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+
+from atomic_io import write_atomic
+from metrics import STEP_SECONDS
+from render_cache import CACHE_DIR
+
+log = logging.getLogger(__name__)
+
+INK_STORE_DIR = os.getenv('INK_STORE_DIR', os.path.join(CACHE_DIR, 'ink'))
+# 旧版按诗文缓存键保存的单张 JPEG（{cache_key}.jpg），首次查找时导入存储
+INK_LEGACY_DIR = os.getenv('INK_LEGACY_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                          'static', 'images', 'poem_bg'))
+# 图片总占用上限（字节），超出后按最近访问时间淘汰
+INK_STORE_MAX_BYTES = int(os.getenv('INK_STORE_MAX_BYTES', str(512 * 1024 * 1024)))
+# 输出宽度（像素），高度按原图比例；最大宽度即生成尺寸，不做放大
+INK_WIDTHS = tuple(int(w) for w in os.getenv('INK_WIDTHS', '320,480,780').split(','))
+
+# 格式 -> (PIL 编码器, 扩展名, MIME, 编码参数)
+FORMATS = {
+    'webp': ('WEBP', 'webp', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', 'image/jpeg', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+
+# 访问时间的刷新间隔（秒），避免每次请求都写目录元数据
+TOUCH_INTERVAL = 60
+
+DIGEST_PATTERN = re.compile(r'^[0-9a-f]{24}$')
+CACHE_KEY_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+VARIANT_PATTERN = re.compile(r'^(\d+)\.(webp|jpg)$')
+EXTENSION_TYPES = {ext: mime for _, ext, mime, _ in FORMATS.values()}
+
+
+def available_formats():
+    """当前 Pillow 可编码的格式（WebP 依赖 libwebp）"""
+    from PIL import features
+
+    return [name for name in FORMATS if name != 'webp' or features.check('webp')]
+
+
+class InkStore:
+    """
+    水墨背景的内容寻址存储
+    每张图按像素内容哈希存放在 {root}/{digest}/ 下，包含各宽度的 WebP 与 JPEG 版本；
+    {root}/keys/{cache_key}.json 记录诗文到 digest 的映射
+    同一 digest 下的文件一经写入不再变化，可使用 immutable 缓存头；
+    总占用超过 max_bytes 时按目录 mtime（最近访问）淘汰最旧的图片
+    legacy_dir 下旧版生成的 {cache_key}.jpg 在首次查找未命中时导入，已有背景不再重新生成
+    """
+
+    def __init__(self, root=INK_STORE_DIR, max_bytes=INK_STORE_MAX_BYTES, widths=INK_WIDTHS,
+                 legacy_dir=INK_LEGACY_DIR):
+        self.root = root
+        self.legacy_dir = legacy_dir
+        self.max_bytes = max_bytes
+        self.widths = tuple(sorted(widths))
+        self._lock = threading.Lock()
+
+    def _key_path(self, cache_key):
+        return os.path.join(self.root, 'keys', f'{cache_key}.json')
+
+    def _touch(self, directory):
+        try:
+            if time.time() - os.path.getmtime(directory) > TOUCH_INTERVAL:
+                os.utime(directory)
+        except FileNotFoundError:
+            pass
+
+    def manifest(self, digest):
+        """digest 对应的各版本描述：{'digest', 'variants': [{'format', 'width', 'url'}]}"""
+        directory = os.path.join(self.root, digest)
+        variants = []
+        for name in sorted(os.listdir(directory)):
+            match = VARIANT_PATTERN.match(name)
+            if match:
+                fmt = 'jpeg' if match.group(2) == 'jpg' else match.group(2)
+                variants.append({'format': fmt, 'width': int(match.group(1)), 'url': f'/ink/{digest}/{name}'})
+        variants.sort(key=lambda v: (v['format'], v['width']))
+        return {'digest': digest, 'variants': variants}
+
+    def lookup(self, cache_key):
+        """按诗文缓存键查找已生成的图片，不存在或已被淘汰时返回 None"""
+        if not CACHE_KEY_PATTERN.match(cache_key):
+            return None
+        try:
+            with open(self._key_path(cache_key), encoding='utf-8') as f:
+                digest = json.load(f)['digest']
+        except FileNotFoundError:
+            return self._import_legacy(cache_key)
+        except (ValueError, KeyError):
+            return None
+        self._touch(os.path.join(self.root, digest))
+        try:
+            return self.manifest(digest)
+        except FileNotFoundError:
+            # 已被淘汰（含与 enforce_budget 并发删除的情形），视为未命中
+            return None
+
+    def put(self, cache_key, img):
+        """
+        生成各宽度、各格式的版本并写入，返回 manifest
+        :param img: 后期处理完成的 PIL 图像（最大宽度）
+        """
+        from PIL import Image
+
+        digest = hashlib.sha256(f'{img.mode}{img.size}'.encode() + img.tobytes()).hexdigest()[:24]
+        directory = os.path.join(self.root, digest)
+        if not os.path.isdir(directory):
+            os.makedirs(self.root, exist_ok=True)
+            staging = tempfile.mkdtemp(dir=self.root, prefix='.staging-')
+            try:
+                with STEP_SECONDS.time(step='ink_encode'):
+                    for width in self.widths:
+                        width = min(width, img.width)
+                        height = round(img.height * width / img.width)
+                        resized = img if width == img.width else img.resize((width, height), Image.LANCZOS)
+                        for fmt in available_formats():
+                            encoder, ext, _, params = FORMATS[fmt]
+                            with open(os.path.join(staging, f'{width}.{ext}'), 'wb') as f:
+                                resized.save(f, format=encoder, **params)
+                # 整个目录一次改名，读者不会看到缺少版本的半成品
+                os.rename(staging, directory)
+            except OSError:
+                shutil.rmtree(staging, ignore_errors=True)
+                # 并发生成了同一张图时，以先完成者为准
+                if not os.path.isdir(directory):
+                    raise
+
+        write_atomic(self._key_path(cache_key), json.dumps({'digest': digest}))
+        self.enforce_budget(keep=digest)
+        return self.manifest(digest)
+
+    def _import_legacy(self, cache_key):
+        """把旧版 {legacy_dir}/{cache_key}.jpg 写入存储，不存在或无法解码时返回 None"""
+        from PIL import Image
+
+        path = os.path.join(self.legacy_dir, f'{cache_key}.jpg')
+        if not os.path.isfile(path):
+            return None
+        try:
+            with Image.open(path) as legacy:
+                img = legacy.convert('RGB')
+        except OSError as e:
+            log.warning(f"旧版水墨背景无法读取：{path}（{e}）")
+            return None
+        log.info(f"导入旧版水墨背景：{path}")
+        return self.put(cache_key, img)
+
+    def file_path(self, digest, variant):
+        """校验路径参数并返回文件路径与 MIME；不存在时返回 None"""
+        match = VARIANT_PATTERN.match(variant)
+        if not DIGEST_PATTERN.match(digest) or not match:
+            return None
+        directory = os.path.join(self.root, digest)
+        path = os.path.join(directory, variant)
+        if not os.path.isfile(path):
+            return None
+        self._touch(directory)
+        return path, EXTENSION_TYPES[match.group(2)]
+
+    def usage(self):
+        """[(最近访问时间, 字节数, digest)]"""
+        entries = []
+        if not os.path.isdir(self.root):
+            return entries
+        for digest in os.listdir(self.root):
+            directory = os.path.join(self.root, digest)
+            if not DIGEST_PATTERN.match(digest) or not os.path.isdir(directory):
+                continue
+            try:
+                size = sum(entry.stat().st_size for entry in os.scandir(directory))
+                entries.append((os.path.getmtime(directory), size, digest))
+            except FileNotFoundError:
+                continue
+        return entries
+
+    def enforce_budget(self, keep=None):
+        """淘汰最久未访问的图片直至总占用不超过上限；keep 为刚写入的图片，不参与淘汰"""
+        with self._lock:
+            entries = sorted(self.usage())
+            total = sum(size for _, size, _ in entries)
+            evicted = 0
+            for _, size, digest in entries:
+                if total <= self.max_bytes:
+                    break
+                if digest == keep:
+                    continue
+                shutil.rmtree(os.path.join(self.root, digest), ignore_errors=True)
+                total -= size
+                evicted += 1
+            if evicted:
+                # 映射文件体积很小，指向已淘汰图片的由 lookup 视为不存在，这里顺带清理
+                self._prune_keys()
+                log.info(f"水墨图片存储淘汰 {evicted} 张，当前占用 {total} 字节")
+            return evicted
+
+    def _prune_keys(self):
+        key_dir = os.path.join(self.root, 'keys')
+        if not os.path.isdir(key_dir):
+            return
+        for name in os.listdir(key_dir):
+            path = os.path.join(key_dir, name)
+            try:
+                with open(path, encoding='utf-8') as f:
+                    digest = json.load(f)['digest']
+            except (OSError, ValueError, KeyError):
+                continue
+            if not os.path.isdir(os.path.join(self.root, digest)):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+
+ink_store = InkStore()
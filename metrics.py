@@ -0,0 +1,201 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DB_HIT_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+# 慢查询 PROFILE 采样阈值（毫秒），0 表示关闭
+PROFILE_SLOW_MS = float(os.getenv('METRICS_PROFILE_SLOW_MS', '0'))
+# 同一条查询两次 PROFILE 之间的最短间隔（秒）
+PROFILE_INTERVAL = float(os.getenv('METRICS_PROFILE_INTERVAL', '300'))
+
+# PROFILE 会真正执行查询，带写操作的语句不采样
+WRITE_CLAUSE = re.compile(r'\b(CREATE|MERGE|DELETE|SET|REMOVE|DROP|LOAD\s+CSV)\b', re.IGNORECASE)
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """按标签分组的累积直方图，输出 Prometheus 文本格式"""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # 标签值元组 -> [各桶计数, 总和, 次数]
+        self._series = {}
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """计时上下文，异常退出同样记录"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def collect(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((key, (list(counts), total, count))
+                            for key, (counts, total, count) in self._series.items())
+        for key, (counts, total, count) in series:
+            labels = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key))
+            prefix = labels + ',' if labels else ''
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{prefix}le="{_format_value(bound)}"}} {bucket_count}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+            suffix = f'{{{labels}}}' if labels else ''
+            lines.append(f'{self.name}_sum{suffix} {_format_value(total)}')
+            lines.append(f'{self.name}_count{suffix} {count}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.collect())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    'http_request_duration_seconds', '各路由请求耗时', ('endpoint', 'method', 'status'))
+GRAPH_QUERY_SECONDS = REGISTRY.histogram(
+    'graph_query_duration_seconds', 'Cypher 查询耗时（含等待连接）', ('query',))
+EXTERNAL_CALL_SECONDS = REGISTRY.histogram(
+    'external_call_duration_seconds', '外部 HTTP 调用耗时', ('target',))
+STEP_SECONDS = REGISTRY.histogram(
+    'step_duration_seconds', '渲染与数据加载步骤耗时', ('step',))
+GRAPH_QUERY_DB_HITS = REGISTRY.histogram(
+    'graph_query_db_hits', '慢查询 PROFILE 得到的 db hits', ('query',), DB_HIT_BUCKETS)
+
+
+def query_id(query):
+    """查询语句的短标识，作为指标标签（语句均为常量，基数有限）"""
+    return hashlib.sha1(' '.join(query.split()).encode('utf-8')).hexdigest()[:10]
+
+
+def total_db_hits(plan):
+    """累加执行计划树中各算子的 dbHits"""
+    if not plan:
+        return 0
+    return plan.get('dbHits', 0) + sum(total_db_hits(child) for child in plan.get('children', ()))
+
+
+class SlowQueryProfiler:
+    """
+    慢查询采样：超过阈值的只读查询在后台以 PROFILE 重跑一次，记录 db hits
+    单线程执行，同一条查询在 interval 内只采样一次，避免放大数据库负载
+    """
+
+    def __init__(self, threshold_ms=PROFILE_SLOW_MS, interval=PROFILE_INTERVAL, max_records=50):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval
+        self.records = deque(maxlen=max_records)
+        self._lock = threading.Lock()
+        self._last_profiled = {}
+        self._executor = None
+
+    @property
+    def enabled(self):
+        return self.threshold > 0
+
+    def observe(self, client, query, parameters, seconds):
+        if not self.enabled or seconds < self.threshold:
+            return
+        stripped = query.lstrip()
+        if WRITE_CLAUSE.search(query) or stripped[:7].upper() in ('PROFILE', 'EXPLAIN'):
+            return
+
+        qid = query_id(query)
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_profiled.get(qid, -self.interval) < self.interval:
+                return
+            self._last_profiled[qid] = now
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='profile')
+        self._executor.submit(self._profile, client, qid, query, dict(parameters), seconds)
+
+    def _profile(self, client, qid, query, parameters, seconds):
+        try:
+            cursor = client.graph.run('PROFILE ' + query, parameters)
+            cursor.data()
+            db_hits = total_db_hits(cursor.plan())
+        except Exception as e:
+            log.warning(f"PROFILE 采样失败 | 查询：{qid} | 错误：{e}")
+            return
+        GRAPH_QUERY_DB_HITS.observe(db_hits, query=qid)
+        self.records.append({
+            'query_id': qid,
+            'query': ' '.join(query.split()),
+            'parameters': sorted(parameters),
+            'seconds': round(seconds, 4),
+            'db_hits': db_hits,
+            'profiled_at': time.time(),
+        })
+
+    def recent(self):
+        return list(self.records)
+
+
+profiler = SlowQueryProfiler()
+
+
+def init_app(app):
+    """为每个请求记录耗时，按 endpoint 分组"""
+    from flask import g, request
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            REQUEST_SECONDS.observe(time.perf_counter() - started,
+                                    endpoint=request.endpoint or 'unmatched',
+                                    method=request.method,
+                                    status=response.status_code)
+        return response
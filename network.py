@@ -0,0 +1,94 @@
+import hashlib
+
+import numpy as np
+
+# 每轮扩展一层：对整个前沿一次查询，每个节点按作品数取前 $cap 位好友；degree 为截取前的好友数
+EXPAND_QUERY = """
+UNWIND $frontier AS name
+MATCH (p:Poet {name: name})-[r:FRIEND_OF]-(other)
+WHERE other.name IS NOT NULL AND other.name <> name
+WITH p, other, type(r) AS relationship
+ORDER BY coalesce(other.num_poems, 0) DESC, other.name
+WITH p, collect(DISTINCT {name: other.name, type: relationship}) AS friends
+RETURN p.name as source, friends[..$cap] as friends, size(friends) as degree
+"""
+
+MAX_DEPTH = 3
+
+
+def expand_network(graph, name, depth=1, degree_cap=30, max_nodes=200):
+    """
+    以 name 为中心逐层扩展社交网络
+    :param depth: 扩展跳数（1-3）
+    :param degree_cap: 第二跳起每个节点最多展开的好友数；中心诗人的好友只受 max_nodes 限制
+    :param max_nodes: 节点总数上限，达到后停止扩展
+    :return: (nodes{姓名: 跳数}, links[(source, target, type)], 是否截断（节点上限或好友上限）)
+    """
+    nodes = {name: 0}
+    links = {}
+    frontier = [name]
+    truncated = False
+
+    for hop in range(1, depth + 1):
+        if not frontier:
+            break
+        cap = max_nodes if hop == 1 else degree_cap
+        rows = graph.run(EXPAND_QUERY, {'frontier': frontier, 'cap': cap}).data()
+        next_frontier = []
+        for row in rows:
+            if row['degree'] > len(row['friends']):
+                truncated = True
+            for friend in row['friends']:
+                target = friend['name']
+                if target not in nodes:
+                    if len(nodes) >= max_nodes:
+                        truncated = True
+                        continue
+                    nodes[target] = hop
+                    next_frontier.append(target)
+                # 无向去重
+                key = tuple(sorted((row['source'], target)))
+                links.setdefault(key, (row['source'], target, friend['type']))
+        frontier = next_frontier
+
+    return nodes, list(links.values()), truncated
+
+
+def force_layout(names, links, iterations=120):
+    """
+    Fruchterman-Reingold 力导向布局（NumPy 向量化）
+    :return: (n, 2) 坐标数组，归一化到 [0, 1]
+    """
+    n = len(names)
+    if n == 1:
+        return np.array([[0.5, 0.5]])
+
+    # 以节点集合为种子，同一网络的布局稳定可复现
+    seed = int(hashlib.md5('|'.join(sorted(names)).encode()).hexdigest()[:8], 16)
+    pos = np.random.default_rng(seed).random((n, 2))
+    index = {node: i for i, node in enumerate(names)}
+    edges = np.array([(index[s], index[t]) for s, t, _ in links], dtype=np.int64).reshape(-1, 2)
+
+    k = np.sqrt(1.0 / n)
+    temperature = 0.1
+    for _ in range(iterations):
+        delta = pos[:, None, :] - pos[None, :, :]
+        dist = np.maximum(np.linalg.norm(delta, axis=-1), 1e-4)
+        # 斥力：所有节点两两之间
+        disp = np.einsum('ijk,ij->ik', delta, k * k / dist ** 2)
+        # 引力：仅沿边
+        if len(edges):
+            edge_delta = pos[edges[:, 0]] - pos[edges[:, 1]]
+            edge_dist = np.maximum(np.linalg.norm(edge_delta, axis=-1), 1e-4)
+            pull = edge_delta * (edge_dist / k)[:, None]
+            np.add.at(disp, edges[:, 0], -pull)
+            np.add.at(disp, edges[:, 1], pull)
+
+        length = np.maximum(np.linalg.norm(disp, axis=-1), 1e-4)
+        pos += disp / length[:, None] * np.minimum(length, temperature)[:, None]
+        temperature *= 0.97
+
+    pos -= pos.min(axis=0)
+    span = pos.max(axis=0)
+    span[span == 0] = 1
+    return pos / span
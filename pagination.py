@@ -0,0 +1,55 @@
+import base64
+import json
+
+
+def encode_cursor(offset):
+    """把偏移量编码为不透明游标"""
+    raw = json.dumps({'o': offset}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        offset = json.loads(base64.urlsafe_b64decode(padded))['o']
+    except (ValueError, KeyError, TypeError):
+        raise ValueError('无效的分页游标')
+    if not isinstance(offset, int) or offset < 0:
+        raise ValueError('无效的分页游标')
+    return offset
+
+
+def _int_param(args, name, default, message):
+    """非数字输入与越界一样抛出本地化的 ValueError"""
+    try:
+        return int(args.get(name, default))
+    except (ValueError, TypeError):
+        raise ValueError(message)
+
+
+def page_params(args, default_limit=20, max_limit=100):
+    """
+    解析分页参数：limit + offset 或 cursor（cursor 优先）
+    :return: (offset, limit)，参数非法时抛出 ValueError
+    """
+    limit = _int_param(args, 'limit', default_limit, 'limit 必须为正整数')
+    if limit < 1:
+        raise ValueError('limit 必须为正整数')
+    limit = min(limit, max_limit)
+
+    cursor = args.get('cursor')
+    if cursor:
+        offset = decode_cursor(cursor)
+    else:
+        offset = _int_param(args, 'offset', 0, 'offset 不能为负数')
+        if offset < 0:
+            raise ValueError('offset 不能为负数')
+    return offset, limit
+
+
+def page_headers(offset, limit, total):
+    """分页元信息通过响应头返回，保持响应体为原有的数组格式"""
+    headers = {'X-Total-Count': str(total)}
+    if offset + limit < total:
+        headers['X-Next-Cursor'] = encode_cursor(offset + limit)
+    return headers
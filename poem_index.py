@@ -0,0 +1,226 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+# 内存索引只保存检索所需的字段；id 为节点 id，用于按页补齐其余字段
+POEMS_QUERY = """
+MATCH (poet:Poet)-[:WROTE]->(poem:Poem)
+RETURN id(poem) as id,
+       poet.name as author,
+       poem.title as title,
+       poem.content as content
+"""
+
+# 可检索的字段
+SEARCH_FIELDS = ('title', 'content')
+# 不进入索引、返回结果时按页查询的字段
+DETAIL_FIELDS = ('trans_content', 'appear', 'background', 'tags', 'formal', 'data', 'zhu')
+
+POEM_DETAILS_QUERY = """
+UNWIND $ids AS poem_id
+MATCH (poem:Poem) WHERE id(poem) = poem_id
+RETURN poem_id, poem {.trans_content, .appear, .background, .tags, .formal, .data, .zhu} as details
+"""
+
+
+def ngrams(text):
+    """中文按字切分：单字 + 相邻双字"""
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+def _lower(text):
+    lowered = text.lower()
+    return text if lowered == text else lowered
+
+
+class PoemIndex:
+    """
+    标题/正文的字符 n-gram 倒排索引
+    倒排表为有序 int32 数组，查询时求交后再做子串校验，语义与 CONTAINS 一致
+    """
+
+    def __init__(self, rows):
+        self.poems = rows
+        # 中文文本 lower() 后通常不变，此时直接引用原字符串，不另存一份
+        self._lowered = {field: [_lower(row.get(field) or '') for row in rows] for field in SEARCH_FIELDS}
+        self._by_author = defaultdict(list)
+        postings = {field: defaultdict(list) for field in SEARCH_FIELDS}
+
+        for poem_id, row in enumerate(rows):
+            self._by_author[row.get('author')].append(poem_id)
+            for field in SEARCH_FIELDS:
+                for gram in ngrams(self._lowered[field][poem_id]):
+                    postings[field][gram].append(poem_id)
+
+        self._by_author = {author: np.array(ids, dtype=np.int32) for author, ids in self._by_author.items()}
+        self._postings = {field: {gram: np.array(ids, dtype=np.int32) for gram, ids in grams.items()}
+                          for field, grams in postings.items()}
+
+    def _candidates(self, field, keyword):
+        """倒排表求交得到候选集（可能含假阳性）"""
+        grams = {keyword} if len(keyword) <= 2 else {keyword[i:i + 2] for i in range(len(keyword) - 1)}
+        lists = []
+        for gram in grams:
+            ids = self._postings[field].get(gram)
+            if ids is None:
+                return np.empty(0, dtype=np.int32)
+            lists.append(ids)
+        lists.sort(key=len)
+        result = lists[0]
+        for ids in lists[1:]:
+            result = np.intersect1d(result, ids, assume_unique=True)
+        return result
+
+    def _rank(self, poem_id, keyword):
+        title = self._lowered['title'][poem_id]
+        if title == keyword:
+            tier = 0
+        elif title.startswith(keyword):
+            tier = 1
+        elif keyword in title:
+            tier = 2
+        else:
+            tier = 3  # 仅正文命中
+        return tier, len(title), poem_id
+
+    def search(self, keyword, author=None, fields=('title',)):
+        """
+        按关键词检索诗作
+        :param author: 限定作者，None 表示全部作者
+        :param fields: 匹配的字段
+        :return: 按相关度排序的诗作 id 列表（完全匹配 > 前缀 > 标题包含 > 正文包含）
+        """
+        keyword = keyword.lower()
+        if author is not None:
+            scope = self._by_author.get(author)
+            if scope is None:
+                return []
+        else:
+            scope = None
+
+        if not keyword:
+            ids = scope if scope is not None else np.arange(len(self.poems), dtype=np.int32)
+            return ids.tolist()
+
+        matched = set()
+        for field in fields:
+            candidates = self._candidates(field, keyword)
+            if scope is not None:
+                candidates = np.intersect1d(candidates, scope, assume_unique=True)
+            if len(keyword) <= 2:
+                # 关键词本身就是索引项，倒排表即精确结果
+                matched.update(candidates.tolist())
+            else:
+                lowered = self._lowered[field]
+                matched.update(i for i in candidates.tolist() if keyword in lowered[i])
+        return sorted(matched, key=lambda poem_id: self._rank(poem_id, keyword))
+
+    def get(self, poem_id):
+        return self.poems[poem_id]
+
+
+class PoemIndexHolder:
+    """
+    持有当前索引：首次使用时同步构建，过期后在后台线程重建，期间继续服务旧索引
+    同一时刻至多一次构建：冷启动时的并发请求（含 warm 的预热线程）都等待同一次构建完成
+    """
+
+    def __init__(self, graph, ttl=3600):
+        self.graph = graph
+        self.ttl = ttl
+        self._index = None
+        self._built_at = 0
+        self._lock = threading.Lock()
+        # 进行中的构建：完成（无论成败）时 set 的 Event，空闲时为 None
+        self._inflight = None
+
+    def _build(self):
+        started = time.perf_counter()
+        index = PoemIndex(self.graph.run(POEMS_QUERY).data())
+        log.info(f"诗作索引构建完成：{len(index.poems)} 首，用时 {time.perf_counter() - started:.2f}s")
+        return index
+
+    def _start_build(self):
+        """登记一次构建（须持有 _lock），返回其完成事件"""
+        done = threading.Event()
+        self._inflight = done
+        return done
+
+    def _run_build(self, done):
+        try:
+            index = self._build()
+            with self._lock:
+                self._index, self._built_at = index, time.time()
+            return index
+        finally:
+            with self._lock:
+                self._inflight = None
+            done.set()
+
+    def with_details(self, rows, fields):
+        """
+        为一页诗作补齐索引之外的字段（仅当 fields 需要时查询一次）
+        :param rows: PoemIndex.get 返回的诗作
+        """
+        if not rows or not any(field in DETAIL_FIELDS for field in fields):
+            return rows
+        found = {r['poem_id']: r['details'] for r in
+                 self.graph.run(POEM_DETAILS_QUERY, {'ids': [row['id'] for row in rows]}).data()}
+        return [dict(row, **found.get(row['id'], {})) for row in rows]
+
+    def _rebuild_in_background(self, done):
+        try:
+            self._run_build(done)
+        except Exception as e:
+            log.error(f"诗作索引重建失败：{e}")
+
+    def refresh(self):
+        """立即同步重建"""
+        index = self._build()
+        with self._lock:
+            self._index, self._built_at = index, time.time()
+        return index
+
+    def expire(self):
+        """标记为过期：下次访问时后台重建，期间继续服务旧索引"""
+        with self._lock:
+            self._built_at = 0
+
+    def warm(self):
+        """启动时后台预热"""
+        with self._lock:
+            if self._index is not None or self._inflight is not None:
+                return
+            done = self._start_build()
+        threading.Thread(target=self._rebuild_in_background, args=(done,), daemon=True).start()
+
+    def get(self):
+        owner = False
+        with self._lock:
+            index = self._index
+            if index is None:
+                done = self._inflight
+                owner = done is None
+                if owner:
+                    done = self._start_build()
+            elif time.time() - self._built_at > self.ttl and self._inflight is None:
+                done = self._start_build()
+                threading.Thread(target=self._rebuild_in_background, args=(done,), daemon=True).start()
+        if index is not None:
+            return index
+
+        if owner:
+            # 由本请求构建，异常直接抛给调用方
+            return self._run_build(done)
+        done.wait()
+        index = self._index
+        if index is None:
+            raise RuntimeError("诗作索引构建失败")
+        return index
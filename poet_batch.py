@@ -0,0 +1,101 @@
+import os
+
+# 可选的对比维度
+FACETS = ('info', 'locations', 'relations', 'annual_counts', 'imagery')
+
+# 单次请求的诗人数量上限
+BATCH_MAX_NAMES = int(os.getenv('POET_BATCH_MAX_NAMES', '20'))
+# imagery 维度每位诗人返回的意象数
+BATCH_IMAGERY_LIMIT = 50
+
+# 以下查询均以 UNWIND $names 一次覆盖全部诗人
+INFO_QUERY = """
+UNWIND $names AS name
+MATCH (p:Poet {name: name})
+RETURN name, p.name as poet_name, p.birth as birth, p.death as death,
+       p.bio as bio, p.num_poems as poem_count
+"""
+
+LOCATIONS_QUERY = """
+UNWIND $names AS name
+MATCH (:Poet {name: name})-[r:VISITED]->(pl:Place)
+RETURN name, collect({name: pl.name, lat: pl.lat, lon: pl.lon, year: r.year, event: r.event}) as locations
+"""
+
+RELATIONS_QUERY = """
+UNWIND $names AS name
+MATCH (:Poet {name: name})-[:FRIEND_OF]-(friend:Poet)
+RETURN name, collect(DISTINCT friend.name) as relations
+"""
+
+
+def sort_locations(locations):
+    """按年份排序，无年份的记录排在最后"""
+    return sorted(locations, key=lambda loc: (loc['year'] is None, loc['year'] or 0))
+
+
+def parse_batch(names, facets, clean_name):
+    """
+    校验并清洗请求参数
+    :param clean_name: 姓名清洗函数
+    :return: (去重后保持顺序的姓名列表, 维度元组)
+    """
+    if isinstance(names, str) or not isinstance(names, (list, tuple)):
+        raise ValueError('names 应为姓名列表')
+    cleaned = list(dict.fromkeys(filter(None, (clean_name(n) for n in names if isinstance(n, str)))))
+    if not cleaned:
+        raise ValueError('缺少有效的诗人姓名')
+    if len(cleaned) > BATCH_MAX_NAMES:
+        raise ValueError(f'单次最多对比 {BATCH_MAX_NAMES} 位诗人')
+
+    facets = tuple(facets or FACETS)
+    unknown = [f for f in facets if f not in FACETS]
+    if unknown:
+        raise ValueError(f"facets 仅支持：{', '.join(FACETS)}")
+    return cleaned, facets
+
+
+def _rows_by_name(graph, query, names):
+    return {row['name']: row for row in graph.run(query, {'names': names}).data()}
+
+
+def fetch_batch(graph, names, facets, timeline_cache, imagery_store):
+    """
+    每个维度一次查询，按诗人组装结果
+    :return: {姓名: {维度: 数据}}；info 维度中不存在的诗人为 None
+    """
+    result = {name: {} for name in names}
+
+    if 'info' in facets:
+        rows = _rows_by_name(graph, INFO_QUERY, names)
+        for name in names:
+            row = rows.get(name)
+            result[name]['info'] = None if row is None else {
+                'name': row['poet_name'], 'birth': row['birth'], 'death': row['death'],
+                'bio': row['bio'], 'poem_count': row['poem_count'],
+            }
+
+    if 'locations' in facets:
+        rows = _rows_by_name(graph, LOCATIONS_QUERY, names)
+        for name in names:
+            result[name]['locations'] = sort_locations(rows[name]['locations']) if name in rows else []
+
+    if 'relations' in facets:
+        rows = _rows_by_name(graph, RELATIONS_QUERY, names)
+        for name in names:
+            relations = rows[name]['relations'] if name in rows else []
+            result[name]['relations'] = sorted(set(friend for friend in relations if friend))
+
+    if 'annual_counts' in facets:
+        # 复用逐年序列缓存，仅未命中的诗人参与查询
+        series = timeline_cache.get_many(names)
+        for name in names:
+            result[name]['annual_counts'] = series[name].rows
+
+    if 'imagery' in facets:
+        # 意象计数来自常驻内存的物化表，不访问图数据库
+        for name in names:
+            result[name]['imagery'] = [{'name': image, 'value': freq} for image, freq in
+                                       imagery_store.top_images(name, limit=BATCH_IMAGERY_LIMIT)]
+
+    return result
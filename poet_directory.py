@@ -0,0 +1,90 @@
+import bisect
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+DIRECTORY_QUERY = """
+MATCH (p:Poet)
+WHERE p.name IS NOT NULL
+RETURN p.name as name, p.num_poems as count
+ORDER BY p.name
+"""
+
+SORT_OPTIONS = ('name', 'num_poems', 'centrality')
+
+
+class PoetDirectory:
+    """
+    全部诗人姓名与作品数的内存快照
+    首次使用时同步加载，过期后后台刷新，刷新期间继续服务旧快照
+    """
+
+    def __init__(self, graph, analytics, ttl=600):
+        self.graph = graph
+        self.analytics = analytics
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # 冷启动加载锁：并发的首批请求只执行一次 DIRECTORY_QUERY
+        self._load_lock = threading.Lock()
+        self._loaded_at = 0
+        self._refreshing = False
+        # (按姓名排序, 按作品数排序, 姓名列表)，整体替换保证一致
+        self._snapshot = None
+
+    def _load(self):
+        rows = [{'name': r['name'], 'count': r['count']} for r in self.graph.run(DIRECTORY_QUERY).data()]
+        rows.sort(key=lambda r: r['name'])
+        by_count = sorted(rows, key=lambda r: (-(r['count'] or 0), r['name']))
+        with self._lock:
+            self._snapshot = (rows, by_count, [r['name'] for r in rows])
+            self._loaded_at = time.time()
+
+    def _refresh_in_background(self):
+        try:
+            self._load()
+        except Exception as e:
+            log.error(f"诗人目录刷新失败：{e}")
+        finally:
+            self._refreshing = False
+
+    def _ensure_fresh(self):
+        if self._snapshot is None:
+            with self._load_lock:
+                if self._snapshot is None:
+                    self._load()
+            return self._snapshot
+        with self._lock:
+            stale = time.time() - self._loaded_at > self.ttl
+            if stale and not self._refreshing:
+                self._refreshing = True
+                threading.Thread(target=self._refresh_in_background, daemon=True).start()
+            return self._snapshot
+
+    def expire(self):
+        """标记为过期：下次访问时后台刷新"""
+        with self._lock:
+            self._loaded_at = 0
+
+    def list(self, sort='name', prefix=''):
+        """
+        按排序方式返回诗人列表，可按姓名前缀筛选
+        :return: [{'name', 'count', ...}]
+        """
+        by_name, by_count, names = self._ensure_fresh()
+        if sort == 'centrality':
+            rows = self.analytics.ranked_poets()
+        elif sort == 'num_poems':
+            rows = by_count
+        else:
+            # 按姓名排序时前缀筛选可直接二分定位区间
+            if prefix:
+                lo = bisect.bisect_left(names, prefix)
+                hi = bisect.bisect_left(names, prefix + chr(0x10FFFF))
+                return by_name[lo:hi]
+            return by_name
+
+        if prefix:
+            rows = [r for r in rows if r['name'].startswith(prefix)]
+        return rows
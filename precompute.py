@@ -0,0 +1,132 @@
+"""
+离线批处理任务
+
+用法：
+    python precompute.py wordfreq [--poets 李白 杜甫] [--workers 4]
+    python precompute.py heat
+    python precompute.py imagery
+    python precompute.py geo
+    python precompute.py analytics [--samples 64]
+    python precompute.py bump-version
+
+heat / imagery / geo / analytics 完成后自动更新数据版本；数据导入后应执行 bump-version，
+运行中的服务据此清理响应缓存与各类派生缓存
+全图查询与 MERGE/DELETE 重建使用独立的数据库客户端：默认不设查询时限（PRECOMPUTE_QUERY_TIMEOUT 可指定秒数），
+不做瞬时错误重试
+"""
+import argparse
+import os
+import sys
+
+import heatmap
+import word_freq
+from graph_analytics import AnalyticsSnapshot
+from geo_clusters import GeoClusterStore
+from graph_client import create_graph_client
+from imagery_store import ImageryStore
+from response_cache import dataset_version
+from segmentation import tokenizer
+
+
+def batch_graph():
+    """离线任务专用的图数据库客户端，连接配置与服务相同（.env）"""
+    from dotenv import load_dotenv
+
+    env_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.env')
+    if os.path.exists(env_path):
+        load_dotenv(env_path)
+    timeout = os.getenv('PRECOMPUTE_QUERY_TIMEOUT')
+    return create_graph_client(query_timeout=float(timeout) if timeout else None, max_retries=0)
+
+
+def fetch_corpora(graph, poets=None):
+    """一次查询取回各诗人的全部诗作内容"""
+    query = """
+    MATCH (p:Poet)-[:WROTE]->(poem)
+    WHERE $poets IS NULL OR p.name IN $poets
+    RETURN p.name as name, collect(coalesce(poem.content, '')) as contents
+    """
+    return [(row['name'], row['contents']) for row in graph.run(query, {'poets': poets}).data()]
+
+
+def run_wordfreq(args):
+    graph = batch_graph()
+
+    corpora = fetch_corpora(graph, args.poets or None)
+    print(f"共 {len(corpora)} 位诗人待分词")
+
+    counters = tokenizer.segment_many((''.join(contents) for _, contents in corpora), workers=args.workers)
+    for (name, contents), counter in zip(corpora, counters):
+        word_freq.save_table(name, counter, word_freq.corpus_digest(contents))
+        print(f"{name}: {len(counter)} 个词")
+
+
+def run_heat(args):
+    graph = batch_graph()
+
+    edges = heatmap.refresh_heat(graph)
+    print(f"HEAT 投影已重建：{edges} 条边")
+    run_bump_version(args)
+
+
+def run_imagery(args):
+    graph = batch_graph()
+
+    rows = ImageryStore(graph).rebuild()
+    print(f"意象计数表已生成：{rows} 行")
+    run_bump_version(args)
+
+
+def run_geo(args):
+    graph = batch_graph()
+
+    places, rows = GeoClusterStore(graph).rebuild()
+    print(f"足迹计数表已生成：{places} 个地点，{rows} 行")
+    run_bump_version(args)
+
+
+def run_analytics(args):
+    graph = batch_graph()
+
+    snapshot = AnalyticsSnapshot(graph)
+    poets, edges = snapshot.rebuild(betweenness_samples=args.samples)
+    print(f"网络指标快照已生成：{poets} 位诗人，{edges} 条好友关系")
+    run_bump_version(args)
+
+
+def run_bump_version(args):
+    version = dataset_version.bump()
+    print(f"数据版本已更新：{version}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='唐诗知识图谱离线预计算')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    wordfreq_parser = subparsers.add_parser('wordfreq', help='批量分词并生成诗人词频表')
+    wordfreq_parser.add_argument('--poets', nargs='*', help='仅处理指定诗人（默认全部）')
+    wordfreq_parser.add_argument('--workers', type=int, default=os.cpu_count(), help='进程数')
+    wordfreq_parser.set_defaults(func=run_wordfreq)
+
+    heat_parser = subparsers.add_parser('heat', help='重建诗人足迹热力投影 (:Poet)-[:HEAT]->(:Place)')
+    heat_parser.set_defaults(func=run_heat)
+
+    imagery_parser = subparsers.add_parser('imagery', help='导出诗人 × 年份 × 意象计数表')
+    imagery_parser.set_defaults(func=run_imagery)
+
+    geo_parser = subparsers.add_parser('geo', help='导出诗人 × 地点到访计数表（地图网格聚合）')
+    geo_parser.set_defaults(func=run_geo)
+
+    analytics_parser = subparsers.add_parser('analytics', help='计算好友网络中心性与社区快照')
+    analytics_parser.add_argument('--samples', type=int, default=64, help='介数中心性抽样源点数')
+    analytics_parser.set_defaults(func=run_analytics)
+
+    bump_parser = subparsers.add_parser('bump-version', help='更新数据版本，使运行中服务的缓存失效')
+    bump_parser.set_defaults(func=run_bump_version)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
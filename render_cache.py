@@ -0,0 +1,147 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from atomic_io import write_atomic
+
+log = logging.getLogger(__name__)
+
+# 缓存根目录，可通过环境变量覆盖
+CACHE_DIR = os.getenv('CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache'))
+# 每个渲染缓存目录的磁盘占用上限（字节），超出后按最近访问时间淘汰
+RENDER_CACHE_MAX_BYTES = int(os.getenv('RENDER_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+# 淘汰到上限的该比例为止，避免每次写入都扫描目录
+EVICT_TO_RATIO = 0.9
+# 访问时间的刷新间隔（秒），避免每次命中都写文件元数据
+TOUCH_INTERVAL = 60
+
+
+def content_key(contents, params):
+    """
+    由内容与渲染参数计算缓存键
+    :param contents: 参与渲染的文本序列（顺序无关）
+    :param params: 渲染参数字典
+    :return: sha256 十六进制串
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps(params, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+    for text in sorted(contents):
+        digest.update(b'\0')
+        digest.update(text.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class RenderCache:
+    """
+    渲染结果的两级缓存：内存 LRU + 磁盘文件
+    键为内容哈希，数据变化即得到新键，旧条目不再命中，由磁盘上限按最近访问时间（文件 mtime）淘汰
+    """
+
+    def __init__(self, namespace, max_entries=128, suffix='.txt', max_bytes=RENDER_CACHE_MAX_BYTES):
+        self.directory = os.path.join(CACHE_DIR, namespace)
+        self.max_entries = max_entries
+        self.suffix = suffix
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        # 键 -> [值, 上次刷新文件 mtime 的时间]
+        self._entries = OrderedDict()
+        # 磁盘占用估计，首次写入时扫描目录得到
+        self._disk_bytes = None
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries[key] = [value, time.time()]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _touch(self, key):
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                # 内存命中也刷新磁盘文件的访问时间，热点条目不会被磁盘淘汰
+                stale = time.time() - entry[1] > TOUCH_INTERVAL
+                if stale:
+                    entry[1] = time.time()
+        if entry is not None:
+            if stale:
+                self._touch(key)
+            return entry[0]
+
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                value = f.read()
+        except OSError:
+            return None
+        self._touch(key)
+        self._remember(key, value)
+        return value
+
+    def put(self, key, value):
+        self._remember(key, value)
+        # 先写临时文件再原子替换，避免并发读到半截内容
+        write_atomic(self._path(key), value)
+        size = len(value.encode('utf-8'))
+        with self._disk_lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(size for _, size, _ in self.usage())
+            else:
+                self._disk_bytes += size
+            over = self._disk_bytes > self.max_bytes
+        if over:
+            self.enforce_budget(keep=key)
+
+    def usage(self):
+        """[(最近访问时间, 字节数, 文件名)]"""
+        entries = []
+        try:
+            scanned = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return entries
+        for entry in scanned:
+            if not entry.name.endswith(self.suffix):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.name))
+        return entries
+
+    def enforce_budget(self, keep=None):
+        """淘汰最久未访问的文件直至占用降到上限的 EVICT_TO_RATIO；keep 为刚写入的键，不参与淘汰"""
+        with self._disk_lock:
+            entries = sorted(self.usage())
+            total = sum(size for _, size, _ in entries)
+            target = self.max_bytes * EVICT_TO_RATIO
+            evicted = 0
+            for _, size, name in entries:
+                if total <= target:
+                    break
+                if keep is not None and name == keep + self.suffix:
+                    continue
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+                total -= size
+                evicted += 1
+            self._disk_bytes = total
+            if evicted:
+                log.info(f"渲染缓存 {self.directory} 淘汰 {evicted} 个文件，当前占用 {total} 字节")
+            return evicted
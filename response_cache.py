@@ -0,0 +1,236 @@
+import gzip
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from atomic_io import write_atomic
+from render_cache import CACHE_DIR
+
+log = logging.getLogger(__name__)
+
+DATASET_VERSION_PATH = os.path.join(CACHE_DIR, 'dataset_version')
+
+# 响应缓存容量：条目数与响应体总字节数双重上限
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '2048'))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+# 条目存活时间（秒）：兜底覆盖简介表、目录快照等不随数据版本变化的输入
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', '300'))
+# 浏览器端缓存时长（秒），过期后凭 ETag 协商
+RESPONSE_MAX_AGE = int(os.getenv('RESPONSE_MAX_AGE', '60'))
+# 小于该字节数的响应不压缩
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', '1024'))
+
+# 编码 -> ETag 后缀；同一内容的不同编码是不同的表示，强 ETag 须各不相同
+ENCODING_SUFFIXES = {'identity': '', 'gzip': '-gz', 'br': '-br'}
+
+
+def _brotli():
+    """brotli 为可选依赖，未安装时仅提供 gzip"""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+class DatasetVersion:
+    """
+    全局数据版本号，保存在 CACHE_DIR/dataset_version
+    数据导入或预计算完成后调用 bump()；各进程按文件 mtime 感知变化并触发失效回调
+    """
+
+    def __init__(self, path=DATASET_VERSION_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._version = None
+        self._listeners = []
+
+    def on_change(self, callback):
+        """注册失效回调，版本变化时依次调用"""
+        self._listeners.append(callback)
+        return callback
+
+    def get(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime and self._version is not None:
+            return self._version
+
+        with self._lock:
+            if mtime != self._mtime or self._version is None:
+                previous = self._version
+                if mtime is None:
+                    version = '0'
+                else:
+                    with open(self.path, encoding='utf-8') as f:
+                        version = f.read().strip() or '0'
+                self._version, self._mtime = version, mtime
+                changed = previous is not None and version != previous
+            else:
+                changed = False
+
+        if changed:
+            log.info(f"数据版本更新为 {self._version}，清理派生缓存")
+            for callback in self._listeners:
+                try:
+                    callback()
+                except Exception as e:
+                    log.error(f"缓存失效回调失败：{e}")
+        return self._version
+
+    def bump(self):
+        """写入新的版本号并返回"""
+        version = f'{time.time_ns():x}'
+        write_atomic(self.path, version)
+        return version
+
+
+class CachedResponse:
+    """一份已渲染的响应体；超过阈值时入缓存前即生成各压缩版本，之后只读"""
+
+    def __init__(self, body, content_type, headers):
+        self.content_type = content_type
+        self.headers = headers
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.expires_at = time.monotonic() + RESPONSE_CACHE_TTL
+        self.bodies = {'identity': body}
+        if len(body) >= COMPRESS_MIN_BYTES:
+            self.bodies['gzip'] = gzip.compress(body, compresslevel=6)
+            brotli = _brotli()
+            if brotli is not None:
+                self.bodies['br'] = brotli.compress(body, quality=5)
+        self.size = sum(len(b) for b in self.bodies.values())
+
+    def negotiate(self, accept_encodings):
+        """
+        按客户端 Accept-Encoding 选择已有的压缩版本
+        取质量值最高者（q=0 表示拒绝，* 通配），同分时优先 br
+        :param accept_encodings: werkzeug Accept 对象（request.accept_encodings）
+        """
+        best, best_quality = 'identity', 0
+        for encoding in ('br', 'gzip'):
+            quality = accept_encodings[encoding] if encoding in self.bodies else 0
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+
+class ResponseCache:
+    """
+    已渲染 JSON 响应的有界 LRU
+    键为 (接口, 路径参数, 查询参数, 数据版本)，数据版本变化后旧条目自然不再命中
+    """
+
+    def __init__(self, max_entries=RESPONSE_CACHE_MAX_ENTRIES, max_bytes=RESPONSE_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._stats = {'hits': 0, 'misses': 0, 'not_modified': 0, 'evictions': 0}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at < time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += entry.size
+            self._evict()
+
+    def _remove(self, key):
+        self._bytes -= self._entries.pop(key).size
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+            self._stats['evictions'] += 1
+
+    def record_not_modified(self):
+        with self._lock:
+            self._stats['not_modified'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return dict(self._stats,
+                        entries=len(self._entries),
+                        bytes=self._bytes,
+                        hit_rate=round(self._stats['hits'] / lookups, 4) if lookups else None)
+
+
+dataset_version = DatasetVersion()
+response_cache = ResponseCache()
+dataset_version.on_change(response_cache.clear)
+
+
+def cached_response(view):
+    """
+    视图装饰器：GET 请求的 200 响应按 (接口, 参数, 数据版本) 缓存
+    附带强 ETag 与 Cache-Control，支持 If-None-Match 返回 304，按需 gzip/br 压缩
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        from flask import current_app, request
+
+        if request.method != 'GET':
+            return view(*args, **kwargs)
+
+        version = dataset_version.get()
+        key = (request.endpoint, tuple(sorted(kwargs.items())),
+               tuple(sorted(request.args.items(multi=True))), version)
+        entry = response_cache.get(key)
+        cache_status = 'HIT'
+        if entry is None:
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.direct_passthrough:
+                return response
+            headers = [(k, v) for k, v in response.headers.items()
+                       if k.lower() not in ('content-type', 'content-length')]
+            entry = CachedResponse(response.get_data(), response.content_type, headers)
+            response_cache.put(key, entry)
+            cache_status = 'MISS'
+
+        # 只与本次协商出的表示比对：客户端缓存的若是它无法解码的压缩版本，应返回完整响应
+        encoding = entry.negotiate(request.accept_encodings)
+        tag = entry.etag + ENCODING_SUFFIXES[encoding]
+        if tag in request.if_none_match:
+            response_cache.record_not_modified()
+            response = current_app.response_class(status=304)
+        else:
+            response = current_app.response_class(entry.bodies[encoding], status=200, headers=entry.headers,
+                                                  content_type=entry.content_type)
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(tag)
+
+        response.headers['Cache-Control'] = f'public, max-age={RESPONSE_MAX_AGE}'
+        response.headers['X-Cache'] = cache_status
+        response.vary.add('Accept-Encoding')
+        return response
+
+    return wrapper
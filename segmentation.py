@@ -0,0 +1,115 @@
+import hashlib
+import os
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from render_cache import CACHE_DIR
+
+# 停用词表路径（默认与本模块同目录）
+STOPWORDS_FILE = os.getenv('STOPWORDS_PATH',
+                           os.path.join(os.path.dirname(os.path.abspath(__file__)), '哈工大停用词表.txt'))
+# jieba 前缀词典的序列化缓存，避免每个进程重新构建
+JIEBA_CACHE_FILE = os.getenv('JIEBA_CACHE_FILE', os.path.join(CACHE_DIR, 'jieba.cache'))
+
+
+def load_stopwords(file_path=STOPWORDS_FILE):
+    """
+    加载停用词表
+    :param file_path: 停用词表文件路径
+    :return: 停用词集合
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        stopwords = frozenset(line.strip() for line in f)
+    return stopwords
+
+
+def init_jieba():
+    """以缓存文件初始化 jieba 词典（重复调用无开销）"""
+    import jieba
+
+    os.makedirs(os.path.dirname(JIEBA_CACHE_FILE), exist_ok=True)
+    jieba.dt.cache_file = JIEBA_CACHE_FILE
+    jieba.initialize()
+    return jieba
+
+
+def count_words(text, stopwords):
+    """
+    精确模式分词并统计词频
+    :param text: 待分词文本
+    :param stopwords: 停用词集合
+    :return: Counter(词 -> 次数)
+    """
+    wordlist = init_jieba().cut(text, cut_all=False)
+    # 过滤无意义的词（含纯空白）
+    return Counter(word for word in wordlist if word.strip() and word not in stopwords)
+
+
+_worker_stopwords = frozenset()
+
+
+def _init_worker(stopwords):
+    global _worker_stopwords
+    _worker_stopwords = stopwords
+    init_jieba()
+
+
+def _count_in_worker(text):
+    return count_words(text, _worker_stopwords)
+
+
+class Tokenizer:
+    """
+    分词服务：启动时预热词典与停用词，按内容哈希缓存分词结果
+    """
+
+    def __init__(self, stopwords_path=STOPWORDS_FILE, max_entries=512):
+        self.stopwords_path = stopwords_path
+        self.max_entries = max_entries
+        self._stopwords = None
+        self._lock = threading.Lock()
+        self._memo = OrderedDict()
+
+    @property
+    def stopwords(self):
+        if self._stopwords is None:
+            self._stopwords = load_stopwords(self.stopwords_path)
+        return self._stopwords
+
+    def warm(self):
+        """加载停用词并初始化 jieba 词典"""
+        init_jieba()
+        return self.stopwords
+
+    def count(self, text):
+        """分词计数；相同内容直接返回缓存结果的副本"""
+        key = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        with self._lock:
+            cached = self._memo.get(key)
+            if cached is not None:
+                self._memo.move_to_end(key)
+                return Counter(cached)
+
+        counter = count_words(text, self.stopwords)
+        with self._lock:
+            self._memo[key] = counter
+            while len(self._memo) > self.max_entries:
+                self._memo.popitem(last=False)
+        return Counter(counter)
+
+    def segment_many(self, texts, workers=None, chunksize=8):
+        """
+        批量分词，将文本分片到进程池并行处理（适合整个语料库）
+        :return: 与 texts 顺序一致的 Counter 列表
+        """
+        texts = list(texts)
+        if len(texts) <= 1 or workers == 1:
+            return [count_words(text, self.stopwords) for text in texts]
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_init_worker,
+                                 initargs=(self.stopwords,)) as pool:
+            return list(pool.map(_count_in_worker, texts, chunksize=chunksize))
+
+
+tokenizer = Tokenizer()
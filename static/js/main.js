@@ -46,21 +46,37 @@ async function loadPoemBackground(poetName, poemContent) {
             signal: controller.signal,
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
-                content: `${poemContent.substring(0, 140)} [青绿山水|工笔重彩|楼阁人物]` // 强化prompt
+                content: `${poemContent.substring(0, 140)} [青绿山水|工笔重彩|楼阁人物]`, // 强化prompt
+                async: true
             })
         });
 
-        const data = await response.json();
+        let data = await response.json();
+
+        // 异步任务：轮询直至完成，不再长时间占用后端工作进程
+        while (data.job_id && (data.status === 'queued' || data.status === 'running')) {
+            await new Promise(resolve => setTimeout(resolve, 2000));
+            const pollResponse = await fetch(API_BASE_URL + data.poll, {signal: controller.signal});
+            data = Object.assign({poll: data.poll}, await pollResponse.json());
+        }
 
         if (data.url) {
             // 成功加载插画
             $container.html(`
                 <div class="illustration-card">
+                    <picture>
+                    ${data.srcset && data.srcset.webp
+                        ? `<source type="image/webp" srcset="${data.srcset.webp}" sizes="(max-width: 576px) 100vw, 780px">`
+                        : ''}
                     <img src="${data.url}" 
+                         ${data.srcset && data.srcset.jpeg
+                            ? `srcset="${data.srcset.jpeg}" sizes="(max-width: 576px) 100vw, 780px"`
+                            : ''}
                          alt="${poetName}诗意插画"
                          class="scroll-reveal"
                          loading="lazy"
                          onerror="this.onerror=null;this.src='/static/images/default_illustration.jpg'">
+                    </picture>
                     <div class="illustration-meta">
                         <span class="poet-name">${poetName}</span>
                         <span class="badge bg-warning">AI生成</span>
@@ -105,27 +121,68 @@ async function loadPoemBackground(poetName, poemContent) {
         attribution: '© OpenStreetMap'
     }).addTo(map);
 
-    // 加载诗人列表
-    $.get(API_BASE_URL+'/api/poets').then(poets => {
-        const select = $('#poetSelect');
-        poets.forEach(poet => {
-            if (poet.name !== '杜甫') {
-                select.append(new Option(`${poet.name} `, poet.name));
+    // 足迹聚合图层：按当前缩放级别与视野请求网格聚合，密集区域合并为一个圆点
+    const clusterLayer = L.layerGroup().addTo(map);
+    let clusterRequest = null;
+    function refreshClusters() {
+        const bounds = map.getBounds();
+        if (clusterRequest) clusterRequest.abort();
+        clusterRequest = $.get(API_BASE_URL+'/api/geo/clusters', {
+            zoom: Math.min(map.getZoom(), 12),
+            // 取两位小数，相近视野复用同一缓存
+            bbox: [bounds.getWest(), bounds.getSouth(), bounds.getEast(), bounds.getNorth()]
+                .map(v => v.toFixed(2)).join(','),
+            poet: currentPoet || ''
+        }).done(data => {
+            clusterLayer.clearLayers();
+            data.clusters.forEach(c => {
+                L.circleMarker([c.lat, c.lon], {
+                    radius: Math.min(6 + Math.sqrt(c.count) * 2, 30),
+                    color: '#8b4513',
+                    weight: 1,
+                    fillOpacity: 0.35
+                }).bindTooltip(c.places > 1
+                    ? `${c.name} 等 ${c.places} 地 · ${c.count} 次`
+                    : `${c.name} · ${c.count} 次`)
+                  .addTo(clusterLayer);
+            });
+        });
+    }
+    map.on('moveend', refreshClusters);
+    refreshClusters();
+
+    // 加载诗人列表：按 X-Next-Cursor 逐页拉取，直到没有下一页
+    function loadPoetPage(cursor) {
+        const params = cursor ? {limit: 5000, cursor: cursor} : {limit: 5000};
+        $.get(API_BASE_URL+'/api/poets', params).then((poets, status, xhr) => {
+            const select = $('#poetSelect');
+            poets.forEach(poet => {
+                if (poet.name !== '杜甫') {
+                    select.append(new Option(`${poet.name} `, poet.name));
+                }
+            });
+            const next = xhr.getResponseHeader('X-Next-Cursor');
+            if (next) {
+                loadPoetPage(next);
             }
         });
-    });
+    }
+    loadPoetPage(null);
 
-    // 监听输入框输入事件
+    // 监听输入框输入事件（防抖：停止输入 250ms 后再请求）
+    let suggestTimer = null;
     poemSearch.on('input', function () {
+        clearTimeout(suggestTimer);
         const keyword = $(this).val().trim();
         const poetName = $('#poetSelect').val();
         if (keyword && poetName) {
-            $.ajax({
+            suggestTimer = setTimeout(() => $.ajax({
                 url: '/api/search_poem_titles',
                 type: 'GET',
                 data: {
                     title: keyword,
-                    author: poetName
+                    author: poetName,
+                    limit: 10
                 },
                 success: function (titles) {
                     if (titles.length) {
@@ -148,7 +205,7 @@ async function loadPoemBackground(poetName, poemContent) {
                     console.error('搜索提示失败：', xhr.statusText);
                     poemSuggestions.hide();
                 }
-            });
+            }), 250);
         } else {
             poemSuggestions.hide();
         }
@@ -221,6 +278,9 @@ async function loadPoemBackground(poetName, poemContent) {
                 }
             }
 
+            // 足迹聚合切换为当前诗人
+            refreshClusters();
+
             // 更新词云
             $('#wordcloud').attr('src', `data:image/png;base64,${wordcloud}`);
 
@@ -245,10 +305,8 @@ async function loadPoemBackground(poetName, poemContent) {
             $('#default-poem').show();
             $('#poem-results').hide();
 
-            // 绘制三个折线图
-            renderTimeSeriesChart(currentPoet);
-            renderAnshiChart(currentPoet);
-            renderPoliticalChart(currentPoet);
+            // 绘制三个折线图（共用一次时间线统计请求）
+            renderTimelineCharts(currentPoet);
 
             // 更新意象分析
             updateImagery(currentPoet);
@@ -537,73 +595,69 @@ async function loadPoemBackground(poetName, poemContent) {
         }
     }
 
-    // 图表1：原有时间序列折线图
-    function renderTimeSeriesChart(poetName) {
-        fetch(API_BASE_URL+`/api/poet_annual_counts/${encodeURIComponent(poetName)}`)
+    // 一次请求取回时间线统计，分发给三个图表
+    function renderTimelineCharts(poetName) {
+        fetch(API_BASE_URL+`/api/poet_timeline_stats/${encodeURIComponent(poetName)}`)
             .then(r => r.json())
-            .then(data => {
-                new Chart(document.getElementById('time-series-chart'), {
-                    type: 'line',
-                    data: {
-                        labels: data.map(d => d.year),
-                        datasets: [{
-                            label: '作品数量',
-                            data: data.map(d => d.count),
-                            borderColor: '#6f8b74'
-                        }]
-                    }
-                });
-            });
+            .then(stats => {
+                renderTimeSeriesChart(stats.annual_counts);
+                renderAnshiChart(stats.anshi);
+                renderPoliticalChart(stats.office);
+            })
+            .catch(e => console.error('图表加载失败:', e));
+    }
+
+    // 图表1：原有时间序列折线图
+    function renderTimeSeriesChart(data) {
+        new Chart(document.getElementById('time-series-chart'), {
+            type: 'line',
+            data: {
+                labels: data.map(d => d.year),
+                datasets: [{
+                    label: '作品数量',
+                    data: data.map(d => d.count),
+                    borderColor: '#6f8b74'
+                }]
+            }
+        });
     }
 
     // 图表2：安史之乱时期块状图
-    function renderAnshiChart(poetName) {
-        fetch(API_BASE_URL+`/api/poet_anshi_periods/${encodeURIComponent(poetName)}`)
-            .then(r => r.json())
-            .then(data => {
-                new Chart(document.getElementById('anshi-periods-chart'), {
-                    type: 'bar',
-                    data: {
-                        labels: ['安史之乱前 (750-755)', '动乱中期 (755-757)', '战后恢复 (757-763)'],
-                        datasets: [{
-                            label: '作品总数',
-                            data: [data.pre_anshi, data.mid_anshi, data.post_anshi],
-                            backgroundColor: ['#dcb988', '#c76f66', '#6f8b74']
-                        }]
-                    },
-                    options: { indexAxis: 'y' } // 横向展示
-                });
-            });
+    function renderAnshiChart(data) {
+        new Chart(document.getElementById('anshi-periods-chart'), {
+            type: 'bar',
+            data: {
+                labels: ['安史之乱前 (750-755)', '动乱中期 (755-757)', '战后恢复 (757-763)'],
+                datasets: [{
+                    label: '作品总数',
+                    data: [data.pre_anshi, data.mid_anshi, data.post_anshi],
+                    backgroundColor: ['#dcb988', '#c76f66', '#6f8b74']
+                }]
+            },
+            options: { indexAxis: 'y' } // 横向展示
+        });
     }
 
     // 图表3：政治身份对比
-    function renderPoliticalChart(poetName) {
-        fetch(API_BASE_URL+`/api/poet_office_periods/${encodeURIComponent(poetName)}`)
-            .then(r => r.json())
-            .then(data => {
-                if (!Array.isArray(data)) { // 验证数据格式
-                    throw new Error('数据格式错误，期待数组');
-                }
+    function renderPoliticalChart(data) {
+        if (!Array.isArray(data)) { // 验证数据格式
+            throw new Error('数据格式错误，期待数组');
+        }
 
-                const labels = data.map(d => `${d.period}（${d.type}）`);
-                const counts = data.map(d => d.count);
-
-                new Chart(document.getElementById('political-status-chart'), {
-                    type: 'bar',
-                    data: {
-                        labels: data.map(d => d.period + ' ' + d.type),
-                        datasets: [{
-                            label: '作品数量',
-                            data: data.map(d => d.count),
-                            backgroundColor: '#5c8194'
-                        }]
-                    },
-                    options: {
-                        indexAxis: 'y' // 横向显示
-                    }
-                });
-            })
-            .catch(e => console.error('图表加载失败:', e));
+        new Chart(document.getElementById('political-status-chart'), {
+            type: 'bar',
+            data: {
+                labels: data.map(d => d.period + ' ' + d.type),
+                datasets: [{
+                    label: '作品数量',
+                    data: data.map(d => d.count),
+                    backgroundColor: '#5c8194'
+                }]
+            },
+            options: {
+                indexAxis: 'y' // 横向显示
+            }
+        });
     }
 
 })();
\ No newline at end of file
@@ -0,0 +1,145 @@
+import numpy as np
+
+from ttl_cache import TTLCache
+
+# 安史之乱各时期（起止年份均含）
+ANSHI_PERIODS = [
+    {'name': 'pre', 'start': 750, 'end': 755},  # 安史之乱前
+    {'name': 'mid', 'start': 755, 'end': 757},  # 动乱中期
+    {'name': 'post', 'start': 757, 'end': 763}  # 恢复期
+]
+
+# 任职时期手册数据（需要维护）
+OFFICIAL_YEARS = {
+    '李白': [742, 743, 744],
+    '杜甫': [755, 756, 757, 758, 759],
+    '王维': [721, 722, 723, 724, 756],
+    '白居易': [806, 807, 808, 809, 810]
+}
+
+ANNUAL_COUNTS_QUERY = """
+MATCH (p:Poet {name: $name})-[:YEARLY_OUTPUT]->(ac:AnnualCount)
+RETURN ac.year AS year, ac.count AS count
+ORDER BY ac.year
+"""
+
+# 多位诗人的逐年序列一次取回
+BATCH_ANNUAL_COUNTS_QUERY = """
+UNWIND $names AS name
+MATCH (p:Poet {name: name})-[:YEARLY_OUTPUT]->(ac:AnnualCount)
+WITH name, ac
+ORDER BY ac.year
+RETURN name, collect({year: ac.year, count: ac.count}) AS counts
+"""
+
+
+class AnnualSeries:
+    """
+    诗人逐年作品数序列
+    以前缀和支持任意年份区间的 O(log n) 求和
+    """
+
+    def __init__(self, rows):
+        rows = [r for r in rows if r['year'] is not None]
+        self.rows = [{'year': r['year'], 'count': r['count']} for r in rows]
+        self.years = np.array([r['year'] for r in rows], dtype=np.int64)
+        counts = np.array([r['count'] or 0 for r in rows], dtype=np.int64)
+        self.cumsum = np.concatenate(([0], np.cumsum(counts)))
+
+    @property
+    def total(self):
+        return int(self.cumsum[-1])
+
+    def range_sums(self, starts, ends):
+        """批量计算 [start, end]（含两端）区间内的作品数"""
+        lo = np.searchsorted(self.years, np.asarray(starts), side='left')
+        hi = np.searchsorted(self.years, np.asarray(ends), side='right')
+        return (self.cumsum[hi] - self.cumsum[lo]).tolist()
+
+    def years_sum(self, years):
+        """指定年份集合内的作品数"""
+        years = np.unique(np.asarray(years, dtype=np.int64))
+        return int(np.sum(self.range_sums(years, years)))
+
+
+def anshi_stats(series):
+    sums = series.range_sums([p['start'] for p in ANSHI_PERIODS], [p['end'] for p in ANSHI_PERIODS])
+    return {p['name'] + '_anshi': total for p, total in zip(ANSHI_PERIODS, sums)}
+
+
+def office_stats(series, name):
+    office_total = series.years_sum(OFFICIAL_YEARS.get(name, []))
+    return [
+        {  # 转换为数组格式
+            "period": "",
+            "type": "在任",
+            "count": office_total
+        },
+        {
+            "period": "",
+            "type": "在野",
+            "count": series.total - office_total
+        }
+    ]
+
+
+def parse_periods(raw):
+    """解析 '750-755,757-763' 形式的自定义时期；格式错误或起始年晚于结束年时抛出 ValueError"""
+    periods = []
+    for item in filter(None, (part.strip() for part in raw.split(','))):
+        start, end = item.split('-')
+        start, end = int(start), int(end)
+        if start > end:
+            raise ValueError(f'起始年晚于结束年：{item}')
+        periods.append((start, end))
+    return periods
+
+
+class TimelineCache:
+    """
+    按诗人缓存逐年序列，过期后重新查询
+    诗人名来自 URL，缓存有容量上限，不存在的名字不会无限累积
+    """
+
+    def __init__(self, graph, ttl=300, max_entries=1024):
+        self.graph = graph
+        self._series = TTLCache(max_entries=max_entries, ttl=ttl)
+
+    @property
+    def ttl(self):
+        return self._series.ttl
+
+    @ttl.setter
+    def ttl(self, value):
+        self._series.ttl = value
+
+    def get(self, name):
+        series = self._series.get(name)
+        if series is None:
+            series = AnnualSeries(self.graph.run(ANNUAL_COUNTS_QUERY, {'name': name}).data())
+            self._series.set(name, series)
+        return series
+
+    def clear(self):
+        self._series.clear()
+
+    def get_many(self, names):
+        """
+        批量获取：命中缓存的直接返回，其余诗人合并为一次 UNWIND 查询
+        :return: {姓名: AnnualSeries}
+        """
+        result = {}
+        for name in names:
+            series = self._series.get(name)
+            if series is not None:
+                result[name] = series
+
+        missing = [name for name in dict.fromkeys(names) if name not in result]
+        if missing:
+            rows = {r['name']: r['counts'] for r in
+                    self.graph.run(BATCH_ANNUAL_COUNTS_QUERY, {'names': missing}).data()}
+            fetched = {name: AnnualSeries(rows.get(name, [])) for name in missing}
+            for name, series in fetched.items():
+                self._series.set(name, series)
+            result.update(fetched)
+        return result
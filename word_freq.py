@@ -0,0 +1,44 @@
+import os
+import re
+
+import numpy as np
+
+from atomic_io import load_npz, save_npz
+from render_cache import CACHE_DIR, content_key
+
+# 每位诗人一张词频表：words / counts 两列 + 语料摘要
+WORD_FREQ_DIR = os.path.join(CACHE_DIR, 'word_freq')
+
+
+def corpus_digest(contents):
+    """诗作内容摘要，用于判断词频表是否过期"""
+    return content_key(contents, {})
+
+
+def table_path(name):
+    safe_name = re.sub(r'[\\/:*?"<>|]', '', name)
+    return os.path.join(WORD_FREQ_DIR, f'{safe_name}.npz')
+
+
+def save_table(name, counter, digest):
+    """以列式 npz 保存词频表（按频次降序）"""
+    items = counter.most_common()
+    words = np.array([w for w, _ in items], dtype=str)
+    counts = np.array([c for _, c in items], dtype=np.int32)
+
+    save_npz(table_path(name), {'words': words, 'counts': counts, 'digest': np.array(digest)})
+
+
+def load_table(name, digest=None):
+    """
+    读取词频表
+    :param digest: 若给出，摘要不一致时视为过期
+    :return: {词: 次数}，不存在或过期时返回 None
+    """
+    try:
+        table = load_npz(table_path(name))
+        if digest is not None and str(table['digest']) != digest:
+            return None
+        return dict(zip(table['words'].tolist(), table['counts'].tolist()))
+    except (OSError, KeyError, ValueError):
+        return None